@@ -0,0 +1,146 @@
+# ann_index.py
+"""FAISS index factory for the configured vector index type
+
+All index types use inner-product metric over L2-normalized vectors, so
+scores stay cosine similarities whichever backend is selected. Flat,
+IVF-Flat and HNSW indexes can hold their vectors scalar-quantized to
+float16 or int8; rescore() then restores exact scores for the top
+candidates from the full-precision matrix.
+"""
+
+import numpy as np
+from config import (FAISS_INDEX_TYPE, IVF_NLIST, IVF_NPROBE, PQ_M, PQ_NBITS,
+                    HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH, VECTOR_QUANTIZATION)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+QUANTIZATIONS = ("none", "fp16", "int8")
+
+# FAISS wants roughly this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def build_index(embeddings, index_type: str = FAISS_INDEX_TYPE, quantization: str = VECTOR_QUANTIZATION):
+    """Create, train and fill an index of the given type
+
+    quantization ("none", "fp16" or "int8") sets how flat, IVF-Flat and
+    HNSW indexes store vectors; IVF-PQ codes are compressed already.
+    """
+    import faiss
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type} (expected one of {', '.join(INDEX_TYPES)})")
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization: {quantization} (expected one of {', '.join(QUANTIZATIONS)})")
+
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    count, dimension = embeddings.shape
+    metric = faiss.METRIC_INNER_PRODUCT
+    # QT_8bit learns a per-dimension range during training
+    qtype = {"fp16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}.get(quantization)
+
+    if index_type == "hnsw":
+        if qtype is None:
+            index = faiss.IndexHNSWFlat(dimension, HNSW_M, metric)
+        else:
+            index = faiss.IndexHNSWSQ(dimension, qtype, HNSW_M, metric)
+            index.train(embeddings)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        # Small corpora cannot train many centroids
+        nlist = max(1, min(IVF_NLIST, count // MIN_POINTS_PER_CENTROID))
+        quantizer = faiss.IndexFlatIP(dimension)
+
+        if index_type == "ivf_pq" and count >= (1 << PQ_NBITS):
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, _pq_subquantizers(dimension), PQ_NBITS, metric)
+        else:
+            if index_type == "ivf_pq":
+                print(f"⚠️ {count} vectors are too few to train PQ codes, using IVF-Flat")
+            if qtype is None:
+                index = faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+            else:
+                index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, qtype, metric)
+
+        index.train(embeddings)
+
+    elif qtype is not None:
+        index = faiss.IndexScalarQuantizer(dimension, qtype, metric)
+        index.train(embeddings)
+
+    else:
+        index = faiss.IndexFlatIP(dimension)
+
+    index.add(embeddings)
+    set_search_params(index)
+    return index
+
+
+def set_search_params(index, nprobe: int = IVF_NPROBE, ef_search: int = HNSW_EF_SEARCH):
+    """Apply query-time tuning knobs to an index that supports them"""
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+
+
+def search_params(index, allowed_ids):
+    """Search parameters restricting a search to allowed_ids, keeping the index's own tuning
+
+    IVF and HNSW indexes reject the generic parameter class, and their own
+    classes would otherwise reset nprobe / efSearch to the FAISS defaults.
+    """
+    import faiss
+
+    selector = faiss.IDSelectorBatch(np.asarray(allowed_ids, dtype=np.int64))
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    if hasattr(index, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def rescore(vectors, query_embeddings: np.ndarray, indices: np.ndarray, k: int) -> tuple:
+    """Exact top-k (scores, indices) among approximate candidates, from the full-precision vectors
+
+    vectors may be a memory-mapped matrix; only the candidate rows are read.
+    Missing candidates (-1) are dropped.
+    """
+    query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+    indices = np.array(indices)
+    scores = np.full(indices.shape, -np.inf, dtype=np.float32)
+
+    for row, candidates in enumerate(indices):
+        valid = candidates >= 0
+        if not valid.any():
+            continue
+        # Sorted row reads keep a memory-mapped matrix on sequential pages
+        ids = np.sort(candidates[valid])
+        exact = np.asarray(vectors[ids], dtype=np.float32) @ query_embeddings[row]
+        scores[row, :len(ids)] = exact
+        indices[row, :len(ids)] = ids
+        indices[row, len(ids):] = -1
+
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    top_scores = np.take_along_axis(scores, order, axis=1)
+    top_indices = np.take_along_axis(indices, order, axis=1)
+    top_indices[~np.isfinite(top_scores)] = -1
+    return top_scores, top_indices
+
+
+def index_memory_bytes(index) -> int:
+    """Approximate in-memory size of an index (its serialized size)"""
+    import faiss
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    """Largest sub-quantizer count up to PQ_M that divides the dimension"""
+    for m in range(min(PQ_M, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
@@ -0,0 +1,134 @@
+# answer_cache.py
+"""Layered answer cache: exact-match LRU plus an optional semantic tier"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from config import (ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, SEMANTIC_CACHE_ENABLED,
+                    SEMANTIC_CACHE_MAX_DISTANCE)
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for exact matching"""
+    query = " ".join(query.lower().split())
+    return re.sub(r'[\s?.!]+$', '', query)
+
+
+class AnswerCache:
+    """Caches answers keyed on normalized query, retrieval parameters and corpus version
+
+    The exact tier is an LRU of normalized queries. The semantic tier, when
+    enabled, returns a cached answer whose query embedding is within
+    max_distance cosine distance of the new one. Both tiers are cleared
+    automatically when the corpus version changes.
+    """
+
+    def __init__(self, max_size: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 semantic_enabled: bool = SEMANTIC_CACHE_ENABLED,
+                 max_distance: float = SEMANTIC_CACHE_MAX_DISTANCE):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.semantic_enabled = semantic_enabled
+        self.max_distance = max_distance
+
+        self._exact = OrderedDict()     # (query, params) -> (value, expires_at)
+        self._semantic = OrderedDict()  # (query, params) -> (unit embedding, value, expires_at)
+        self._lock = threading.Lock()
+        self.version = None
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get(self, query: str, params: tuple, version: str, query_embedding=None):
+        """Get a cached value, or None on a miss"""
+        key = (normalize_query(query), params)
+        now = time.time()
+
+        with self._lock:
+            self._check_version(version)
+
+            entry = self._exact.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._exact.move_to_end(key)
+                    self.exact_hits += 1
+                    return value
+                del self._exact[key]
+
+            if self.semantic_enabled and query_embedding is not None:
+                value = self._semantic_lookup(params, query_embedding, now)
+                if value is not None:
+                    self.semantic_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, params: tuple, version: str, value, query_embedding=None):
+        """Cache a value under the query and retrieval parameters"""
+        key = (normalize_query(query), params)
+        expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._check_version(version)
+
+            self._exact[key] = (value, expires_at)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_size:
+                self._exact.popitem(last=False)
+
+            if self.semantic_enabled and query_embedding is not None:
+                self._semantic[key] = (self._unit(query_embedding), value, expires_at)
+                self._semantic.move_to_end(key)
+                while len(self._semantic) > self.max_size:
+                    self._semantic.popitem(last=False)
+
+    def invalidate(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._exact.clear()
+            self._semantic.clear()
+
+    def get_stats(self) -> dict:
+        """Get hit/miss counters and sizes"""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+            "size": len(self._exact)
+        }
+
+    def _check_version(self, version: str):
+        """Clear both tiers when the corpus (and so the index) has changed"""
+        if version != self.version:
+            self._exact.clear()
+            self._semantic.clear()
+            self.version = version
+
+    def _semantic_lookup(self, params: tuple, query_embedding, now: float):
+        """Find the closest cached query with the same parameters"""
+        keys = [key for key, (_, _, expires_at) in self._semantic.items()
+                if key[1] == params and expires_at > now]
+        if not keys:
+            return None
+
+        matrix = np.stack([self._semantic[key][0] for key in keys])
+        similarities = matrix @ self._unit(query_embedding)
+        best = int(np.argmax(similarities))
+
+        if 1.0 - similarities[best] <= self.max_distance:
+            self._semantic.move_to_end(keys[best])
+            return self._semantic[keys[best]][1]
+        return None
+
+    def _unit(self, embedding) -> np.ndarray:
+        """L2-normalize an embedding"""
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
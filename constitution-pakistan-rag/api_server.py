@@ -0,0 +1,341 @@
+# api_server.py
+"""Headless HTTP API for the RAG engine, without Streamlit
+
+Endpoints (JSON in, JSON out):
+
+    GET  /health   readiness of the shared engine
+    GET  /stats    telemetry counters and per-stage latency
+    POST /search   {"query", "k", "threshold", "filters"} -> ranked sources;
+                   filters (document, part, article) need a corpus
+    POST /ask      {"query", "k", "stream"} -> answer and sources; with
+                   "stream": true the answer arrives as NDJSON lines
+    POST /batch    {"queries", "k", "threshold", "answer"} -> one result per
+                   query; searches run concurrently so the query batcher can
+                   share encode calls between them
+
+Each worker process loads one engine that all its request threads share.
+With --workers above 1, the workers listen on the same port (SO_REUSEPORT)
+and the kernel spreads connections between them. A single process builds
+or verifies the index before they start, so workers only load it from
+disk. The first worker to bind METRICS_PORT serves /metrics for itself only:
+
+    python api_server.py --port 8000 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from corpus_manager import FILTER_FIELDS
+from extractive_answer import TITLE_PATTERN
+from rag_system import get_shared_rag_system
+from telemetry import telemetry
+from config import API_HOST, API_PORT, API_WORKERS, API_MAX_BATCH, QUERY_BATCH_MAX_SIZE
+
+
+def format_sources(chunks: list, scores: list) -> list:
+    """Chunks and scores as JSON-ready source entries"""
+    sources = []
+    for chunk, score in zip(chunks, scores):
+        title = TITLE_PATTERN.search(chunk)
+        sources.append({"title": title.group(1) if title else "Section", "text": chunk, "score": float(score)})
+    return sources
+
+
+def parse_query(request: dict) -> tuple:
+    """Validated (query, k) of a request; raises ValueError"""
+    query = request.get("query")
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("'query' must be a non-empty string")
+
+    k = request.get("k", 5)
+    if not isinstance(k, int) or not 1 <= k <= 50:
+        raise ValueError("'k' must be an integer between 1 and 50")
+    return query, k
+
+
+def parse_threshold(request: dict):
+    """Validated similarity threshold of a request, or None; raises ValueError"""
+    threshold = request.get("threshold")
+    if threshold is None:
+        return None
+    if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not -1.0 <= threshold <= 1.0:
+        raise ValueError("'threshold' must be a number between -1 and 1")
+    return float(threshold)
+
+
+def parse_filters(request: dict, rag):
+    """Validated metadata filters of a request, or None; raises ValueError"""
+    filters = request.get("filters")
+    if filters is None:
+        return None
+
+    fields = ("document",) + FILTER_FIELDS
+    if not isinstance(filters, dict) or any(field not in fields for field in filters):
+        raise ValueError(f"'filters' must be an object with keys among {', '.join(fields)}")
+    for field, value in filters.items():
+        values = [value] if isinstance(value, str) else value
+        if not isinstance(values, list) or not all(isinstance(item, str) for item in values):
+            raise ValueError(f"filter '{field}' must be a string or a list of strings")
+    # Only corpus shards carry the metadata the filters select on
+    if filters and rag.corpus_manager is None:
+        raise ValueError("'filters' need a multi-document corpus (CORPUS_DIR)")
+    return filters
+
+
+class RAGRequestHandler(BaseHTTPRequestHandler):
+    """Request handler; the engine is shared through the server instance"""
+
+    # Keep-alive lets clients reuse connections at high request rates
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: dict):
+        """One NDJSON line as an HTTP chunk"""
+        line = json.dumps(data).encode('utf-8') + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode('ascii') + line + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        rag = self.server.rag
+        if self.path == "/health":
+            readiness = rag.get_readiness()
+            self._send_json(200 if readiness["searchable"] else 503, readiness)
+        elif self.path == "/stats":
+            self._send_json(200, telemetry.get_stats())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        handlers = {"/search": self.handle_search, "/ask": self.handle_ask, "/batch": self.handle_batch}
+        handler = handlers.get(self.path)
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON body"})
+            return
+
+        if not isinstance(request, dict):
+            self._send_json(400, {"error": "JSON body must be an object"})
+        elif handler is None:
+            self._send_json(404, {"error": "not found"})
+        elif not self.server.rag.searchable:
+            self._send_json(503, {"error": "system is starting up", **self.server.rag.get_readiness()})
+        else:
+            try:
+                handler(request)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+            except Exception as e:
+                telemetry.increment("errors", stage="api")
+                print(f"❌ API request to {self.path} failed: {e}")
+                self._send_json(500, {"error": str(e)})
+
+    def handle_search(self, request: dict):
+        """Ranked sources for one query"""
+        query, k = parse_query(request)
+        threshold, filters = parse_threshold(request), parse_filters(request, self.server.rag)
+        start = time.perf_counter()
+        with telemetry.trace("api_search", query=query, k=k):
+            chunks, scores = self.server.rag.search(query, k, threshold, filters)
+        self._send_json(200, {"query": query, "sources": format_sources(chunks, scores),
+                              "elapsed_ms": (time.perf_counter() - start) * 1000})
+
+    def handle_ask(self, request: dict):
+        """Answer one question, streamed as NDJSON when requested"""
+        query, k = parse_query(request)
+        if request.get("stream"):
+            self._stream_answer(query, k)
+            return
+
+        start = time.perf_counter()
+        stats = {}
+        answer, chunks, scores = self.server.rag.answer_question(query, k, stats)
+        self._send_json(200, {"query": query, "answer": answer, "mode": stats.get("mode"),
+                              "sources": format_sources(chunks, scores),
+                              "elapsed_ms": (time.perf_counter() - start) * 1000})
+
+    def _stream_answer(self, query: str, k: int):
+        """Sources first, then one line per token, then the generation stats"""
+        rag = self.server.rag
+        with telemetry.trace("api_ask_stream", query=query, k=k):
+            cached = rag.get_cached_answer(query, (k,))
+            if cached is not None:
+                answer, chunks, scores = cached
+            else:
+                chunks, scores = rag.search(query, k)
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            # With the status line sent, a failure can only end the response early
+            try:
+                self._write_chunk({"sources": format_sources(chunks, scores)})
+
+                stats = {}
+                if cached is not None:
+                    stats["mode"] = "cache"
+                    self._write_chunk({"token": answer})
+                elif chunks:
+                    answer = ""
+                    for piece in rag.ollama_client.stream_rag_response(query, chunks, stats):
+                        answer += piece
+                        self._write_chunk({"token": piece})
+                    if answer and stats.get("mode") == "stream":
+                        rag.cache_answer(query, (k,), answer, chunks, scores)
+
+                telemetry.annotate(mode=stats.get("mode"), chunks=len(chunks))
+                self._write_chunk({"done": True, "stats": stats})
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except Exception as e:
+                telemetry.increment("errors", stage="api")
+                print(f"❌ Streaming answer failed after headers were sent: {e}")
+                self.close_connection = True
+
+    def handle_batch(self, request: dict):
+        """Search (or answer) many queries in one request"""
+        queries = request.get("queries")
+        if not isinstance(queries, list) or not queries:
+            raise ValueError("'queries' must be a non-empty list")
+        if len(queries) > API_MAX_BATCH:
+            raise ValueError(f"at most {API_MAX_BATCH} queries per batch")
+        parsed = [parse_query({"query": query, "k": request.get("k", 5)}) for query in queries]
+        threshold = parse_threshold(request)
+
+        rag = self.server.rag
+        start = time.perf_counter()
+        with telemetry.trace("api_batch", queries=len(parsed)):
+            if request.get("answer"):
+                # The async pipeline caps concurrent generations and shares duplicate questions,
+                # across requests too since they all run on the server's one event loop
+                async def answer_all():
+                    return await asyncio.gather(*(rag.answer_question_async(query, k) for query, k in parsed))
+                answers = asyncio.run_coroutine_threadsafe(answer_all(), self.server.loop).result()
+                results = [{"query": query, "answer": answer, "sources": format_sources(chunks, scores)}
+                           for (query, _), (answer, chunks, scores) in zip(parsed, answers)]
+            else:
+                # Concurrent searches let the query batcher share encode calls between them
+                with ThreadPoolExecutor(max_workers=min(len(parsed), QUERY_BATCH_MAX_SIZE)) as pool:
+                    hits = list(pool.map(lambda item: rag.search(item[0], item[1], threshold), parsed))
+                results = [{"query": query, "sources": format_sources(chunks, scores)}
+                           for (query, _), (chunks, scores) in zip(parsed, hits)]
+
+        self._send_json(200, {"results": results, "elapsed_ms": (time.perf_counter() - start) * 1000})
+
+
+class RAGServer(ThreadingHTTPServer):
+    """Threaded HTTP server that can share its port with sibling worker processes
+
+    Async work from all request threads runs on one long-lived event loop, so
+    its HTTP client, generation semaphore and in-flight table are shared.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple, rag, reuse_port: bool = False):
+        self.rag = rag
+        self.reuse_port = reuse_port
+        self.loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self.loop.run_forever, name="rag-api-loop", daemon=True)
+        self._loop_thread.start()
+        super().__init__(address, RAGRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        if self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.rag.async_ollama_client.aclose(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._loop_thread.join()
+        self.loop.close()
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def serve(host: str = API_HOST, port: int = API_PORT, reuse_port: bool = False):
+    """Run one worker: warm up the engine in the background and serve requests meanwhile"""
+    rag = get_shared_rag_system()
+    rag.start_warmup()
+
+    server = RAGServer((host, port), rag, reuse_port)
+    print(f"🌐 RAG API listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def prepare_index():
+    """Build or verify the on-disk index, then exit; run once before spawning workers"""
+    if not get_shared_rag_system().initialize_system():
+        raise SystemExit(1)
+
+
+def main():
+    """Start the API server with one or more worker processes"""
+    parser = argparse.ArgumentParser(description="Headless RAG API server")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Processes, each with its own engine")
+    args = parser.parse_args()
+
+    if args.workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        print("⚠️ SO_REUSEPORT is not available on this platform, running a single worker")
+        args.workers = 1
+
+    if args.workers <= 1:
+        serve(args.host, args.port)
+        return
+
+    # Spawned workers each import the engine fresh instead of sharing forked state
+    context = multiprocessing.get_context("spawn")
+
+    # Workers starting cold would all build the index at once and overwrite each other's files
+    preparer = context.Process(target=prepare_index, name="rag-api-prepare")
+    preparer.start()
+    try:
+        preparer.join()
+    except KeyboardInterrupt:
+        preparer.terminate()
+        return
+    if preparer.exitcode != 0:
+        print("⚠️ Index preparation failed, starting workers anyway")
+
+    workers = [context.Process(target=serve, args=(args.host, args.port, True), name=f"rag-api-{i}")
+               for i in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmark_ann_indexes.py
+"""Benchmark the configurable FAISS index types against the flat baseline
+
+For each synthetic corpus size, builds every index type from ann_index,
+then reports build time, recall@k against exact flat search, p50/p99
+single-query latency and index memory.
+
+    python benchmarks/benchmark_ann_indexes.py --sizes 10000 100000 --dim 384 --k 10
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Add project directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import INDEX_TYPES, build_index, index_memory_bytes, set_search_params
+from embedding_manager import normalize_vectors
+
+
+def synthetic_corpus(size: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, size // 100), dimension)).astype(np.float32)
+    assignment = rng.integers(0, len(centers), size)
+    vectors = centers[assignment] + 0.5 * rng.standard_normal((size, dimension)).astype(np.float32)
+    return normalize_vectors(vectors)
+
+
+def synthetic_queries(corpus: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    """Perturbed corpus vectors, so every query has true near neighbours"""
+    rng = np.random.default_rng(seed)
+    picks = corpus[rng.integers(0, len(corpus), count)]
+    return normalize_vectors(picks + 0.3 * rng.standard_normal(picks.shape).astype(np.float32))
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Fraction of the true top-k that the index returned"""
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def measure_latency(index, queries: np.ndarray, k: int) -> tuple:
+    """p50 and p99 latency in milliseconds for one query at a time"""
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query.reshape(1, -1), k)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (MiniLM is 384)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=None, help="Sweep IVF nprobe values")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=None, help="Sweep HNSW efSearch values")
+    args = parser.parse_args()
+
+    header = f"{'size':>8} {'index':>9} {'param':>12} {'build s':>8} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'MB':>8}"
+
+    for size in args.sizes:
+        corpus = synthetic_corpus(size, args.dim)
+        queries = synthetic_queries(corpus, args.queries)
+
+        print(f"\nCorpus of {size} vectors, {args.dim} dims, {args.queries} queries, k={args.k}")
+        print(header)
+
+        baseline = build_index(corpus, "flat")
+        _, truth = baseline.search(queries, args.k)
+
+        for index_type in args.types:
+            start = time.perf_counter()
+            index = build_index(corpus, index_type)
+            build_time = time.perf_counter() - start
+            memory_mb = index_memory_bytes(index) / (1024 * 1024)
+
+            # Sweep the query-time knob for this type, or use the configured value
+            if index_type.startswith("ivf") and args.nprobe:
+                settings = [(f"nprobe={n}", {"nprobe": n}) for n in args.nprobe]
+            elif index_type == "hnsw" and args.ef_search:
+                settings = [(f"efSearch={ef}", {"ef_search": ef}) for ef in args.ef_search]
+            else:
+                settings = [("default", {})]
+
+            for label, params in settings:
+                set_search_params(index, **params)
+                _, found = index.search(queries, args.k)
+                p50, p99 = measure_latency(index, queries, args.k)
+
+                print(f"{size:>8} {index_type:>9} {label:>12} {build_time:>8.2f} "
+                      f"{recall_at_k(found, truth):>9.3f} {p50:>8.3f} {p99:>8.3f} {memory_mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
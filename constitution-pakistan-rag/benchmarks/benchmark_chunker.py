@@ -0,0 +1,118 @@
+# benchmark_chunker.py
+"""Benchmark the structural chunker against the original regex-split chunker
+
+Generates a synthetic constitution with Parts, Chapters, Articles and
+numbered clauses (some articles far longer than one chunk), then reports
+wall time, chunk count and peak Python memory for both chunkers.
+
+    python benchmarks/benchmark_chunker.py --articles 2000 20000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+# Add project directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CHUNK_MIN_LENGTH
+from structural_chunker import StructuralChunker
+
+WORDS = ("state", "law", "citizen", "federal", "parliament", "province", "court", "right",
+         "person", "shall", "provided", "subject", "public", "order", "authority", "president")
+
+
+def synthetic_constitution(articles: int, seed: int = 0) -> str:
+    """A large Part/Chapter/Article/clause document"""
+    rng = random.Random(seed)
+    lines = ["THE CONSTITUTION OF THE ISLAMIC REPUBLIC OF PAKISTAN", "",
+             "Preamble: " + " ".join(rng.choice(WORDS) for _ in range(120)), ""]
+
+    roman = ("I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X", "XI", "XII")
+    for number in range(1, articles + 1):
+        if number % 250 == 1:
+            lines += [f"PART {roman[(number // 250) % len(roman)]} - GENERAL", ""]
+        if number % 50 == 1:
+            lines += [f"CHAPTER {(number // 50) % 10 + 1}. - PROVISIONS", ""]
+
+        lines.append(f"Article {number}: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 40))))
+        # One article in ten has many clauses and overflows a chunk
+        for clause in range(1, (12 if number % 10 == 0 else rng.randint(0, 3)) + 1):
+            lines.append(f"({clause}) " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))))
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+def legacy_chunk(text: str) -> list:
+    """The original chunk_document: re.split, f-string joins and += line growth"""
+    chunks = re.split(r'(PART\s+[IVXLCDM]+|Article\s+\d+[A-Z]?)', text)
+
+    final_chunks = []
+    for i in range(1, len(chunks), 2):
+        heading = chunks[i].strip()
+        body = chunks[i+1].strip() if i+1 < len(chunks) else ""
+        if heading and body:
+            chunk = f"{heading}\n{body}"
+            if len(chunk.strip()) > CHUNK_MIN_LENGTH:
+                final_chunks.append(chunk)
+
+    processed_chunks = []
+    for chunk in final_chunks:
+        if len(chunk) > 2000:
+            current_chunk = ""
+            for line in chunk.split('\n'):
+                if len(current_chunk) + len(line) > 1500 and current_chunk:
+                    processed_chunks.append(current_chunk.strip())
+                    current_chunk = line + "\n"
+                else:
+                    current_chunk += line + "\n"
+            if current_chunk.strip():
+                processed_chunks.append(current_chunk.strip())
+        else:
+            processed_chunks.append(chunk)
+
+    return processed_chunks
+
+
+def structural_chunk(text: str) -> list:
+    """The structural chunker, fed the whole text at once"""
+    chunker = StructuralChunker()
+    return chunker.feed(text, 1) + chunker.finish()
+
+
+def measure(chunk, text: str) -> tuple:
+    """Wall time in seconds, chunk count and peak traced memory in MB"""
+    start = time.perf_counter()
+    chunks = chunk(text)
+    elapsed = time.perf_counter() - start
+
+    # Tracing slows allocation-heavy code down, so memory gets its own run
+    tracemalloc.start()
+    chunk(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, len(chunks), peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, nargs="+", default=[2000, 10000, 40000])
+    args = parser.parse_args()
+
+    print(f"{'articles':>9} {'MB text':>8} {'chunker':>11} {'seconds':>8} {'chunks':>7} {'peak MB':>8}")
+    for articles in args.articles:
+        text = synthetic_constitution(articles)
+        size_mb = len(text) / (1024 * 1024)
+
+        for name, chunk in (("legacy", legacy_chunk), ("structural", structural_chunk)):
+            elapsed, count, peak = measure(chunk, text)
+            print(f"{articles:>9} {size_mb:>8.1f} {name:>11} {elapsed:>8.2f} {count:>7} {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmark_quantization.py
+"""Report memory saved and recall lost by quantized vector storage
+
+For each synthetic corpus size and index type, builds the index with
+float32, float16 and int8 vectors and reports index memory, the saving
+over float32, recall@k against exact search before and after exact
+re-scoring from the full-precision matrix, and p50 query latency
+including re-scoring.
+
+    python benchmarks/benchmark_quantization.py --sizes 10000 100000 --dim 384 --k 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+# Add project directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import QUANTIZATIONS, build_index, index_memory_bytes, rescore
+from config import RESCORE_FACTOR
+from benchmark_ann_indexes import synthetic_corpus, synthetic_queries, recall_at_k
+
+
+def measure_latency(index, vectors, queries: np.ndarray, k: int, factor: int) -> float:
+    """p50 latency in milliseconds for one query at a time, re-scoring included"""
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        query = query.reshape(1, -1)
+        if factor > 1:
+            _, candidates = index.search(query, k * factor)
+            rescore(vectors, query, candidates, k)
+        else:
+            index.search(query, k)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (MiniLM is 384)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=["flat", "hnsw"], choices=["flat", "ivf_flat", "hnsw"])
+    parser.add_argument("--rescore-factor", type=int, default=RESCORE_FACTOR)
+    args = parser.parse_args()
+
+    header = (f"{'size':>8} {'index':>9} {'vectors':>8} {'MB':>8} {'saved':>7} "
+              f"{'recall@k':>9} {'rescored':>9} {'p50 ms':>8}")
+
+    for size in args.sizes:
+        corpus = synthetic_corpus(size, args.dim)
+        queries = synthetic_queries(corpus, args.queries)
+        _, truth = build_index(corpus, "flat", "none").search(queries, args.k)
+
+        # Re-scoring reads the full-precision matrix from disk, as the app does
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "vectors.npy")
+            np.save(path, corpus)
+            vectors = np.load(path, mmap_mode='r')
+
+            print(f"\nCorpus of {size} vectors, {args.dim} dims, {args.queries} queries, k={args.k}, "
+                  f"re-scoring {args.k * args.rescore_factor} candidates")
+            print(header)
+
+            for index_type in args.types:
+                baseline_mb = None
+                for quantization in QUANTIZATIONS:
+                    index = build_index(corpus, index_type, quantization)
+                    memory_mb = index_memory_bytes(index) / (1024 * 1024)
+                    baseline_mb = baseline_mb or memory_mb
+
+                    _, found = index.search(queries, args.k)
+                    recall = recall_at_k(found, truth)
+
+                    factor = args.rescore_factor if quantization != "none" else 1
+                    if factor > 1:
+                        _, candidates = index.search(queries, args.k * factor)
+                        _, rescored = rescore(vectors, queries, candidates, args.k)
+                        rescored_recall = recall_at_k(rescored, truth)
+                    else:
+                        rescored_recall = recall
+                    p50 = measure_latency(index, vectors, queries, args.k, factor)
+
+                    print(f"{size:>8} {index_type:>9} {quantization:>8} {memory_mb:>8.1f} "
+                          f"{1 - memory_mb / baseline_mb:>6.0%} {recall:>9.3f} {rescored_recall:>9.3f} {p50:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
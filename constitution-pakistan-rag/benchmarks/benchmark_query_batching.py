@@ -0,0 +1,81 @@
+# benchmark_query_batching.py
+"""Benchmark search throughput with and without query micro-batching
+
+Runs the same query load through EmbeddingManager.search (one encode per
+query) and QueryBatcher.search (concurrent queries share one encode) at
+several concurrency levels and prints queries/second for each.
+
+    python benchmarks/benchmark_query_batching.py --queries 400 --concurrency 1 4 16 32
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_processor import DocumentProcessor
+from embedding_manager import EmbeddingManager
+from query_batcher import QueryBatcher
+
+QUERIES = [
+    "What is the state religion?",
+    "What are fundamental rights?",
+    "How is the Prime Minister appointed?",
+    "What are the powers of the Supreme Court?",
+    "Who is the head of state?",
+    "What does the Constitution say about freedom of speech?",
+    "How can the Constitution be amended?",
+    "What is the role of the Senate?",
+]
+
+
+def run_load(search, total_queries: int, concurrency: int) -> float:
+    """Issue total_queries searches from concurrency threads; returns queries/sec"""
+    queries = [QUERIES[i % len(QUERIES)] for i in range(total_queries)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda q: search(q, 5), queries))
+    elapsed = time.perf_counter() - start
+
+    return total_queries / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=400, help="Queries per run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    # Index the sample document
+    processor = DocumentProcessor()
+    chunks = processor.chunk_document(processor.load_document())
+
+    manager = EmbeddingManager()
+    manager.load_model()
+    manager.create_embeddings(chunks)
+    manager.create_faiss_index()
+
+    batcher = QueryBatcher(manager, args.max_batch_size, args.max_wait_ms)
+
+    # Warm up both paths
+    run_load(manager.search, 16, 4)
+    run_load(batcher.search, 16, 4)
+
+    print(f"\n{'concurrency':>12} {'direct q/s':>12} {'batched q/s':>12} {'speedup':>8}")
+    for concurrency in args.concurrency:
+        direct = run_load(manager.search, args.queries, concurrency)
+        batched = run_load(batcher.search, args.queries, concurrency)
+        print(f"{concurrency:>12} {direct:>12.1f} {batched:>12.1f} {batched / direct:>7.2f}x")
+
+    print(f"\nBatcher stats: {batcher.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# benchmark_rag.py
+"""End-to-end benchmark and retrieval evaluation of the RAG pipeline
+
+Indexes a document with DocumentProcessor and EmbeddingManager, runs the
+golden questions through EmbeddingManager.search and OllamaClient against
+a local stub Ollama server with simulated latency, and reports:
+
+    recall@k and MRR of the expected articles
+    p50/p95/p99 latency of each stage
+    end-to-end throughput at several concurrency levels
+    peak RSS
+
+Results are written as JSON; pass a previous run as --baseline to print
+the change in every headline metric.
+
+    python benchmarks/benchmark_rag.py --concurrency 1 4 8 --token-delay 0.01 --output results.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Add project directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DEFAULT_PDF_PATH, EMBEDDING_MODEL, FAISS_INDEX_TYPE, HYBRID_SEARCH_ENABLED
+from document_processor import DocumentProcessor
+from embedding_manager import EmbeddingManager
+from ollama_client import OllamaClient
+from stub_ollama_server import start_stub_server
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_questions.json")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def percentiles(samples: list) -> dict:
+    """p50/p95/p99 and mean of latency samples, in milliseconds"""
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "count": 0}
+    ms = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(ms.mean()), "count": len(ms)}
+
+
+def retrieved_articles(chunks: list, chunk_articles: dict) -> list:
+    """Article label of each retrieved chunk, in rank order"""
+    return [chunk_articles.get(chunk) for chunk in chunks]
+
+
+def evaluate_retrieval(manager: EmbeddingManager, golden: list, chunk_articles: dict, k: int, timings: dict) -> dict:
+    """recall@k and MRR of the expected articles over the golden set"""
+    recalls, reciprocal_ranks, misses = [], [], []
+    for item in golden:
+        start = time.perf_counter()
+        chunks, _ = manager.search(item["question"], k)
+        timings["search"].append(time.perf_counter() - start)
+
+        articles = retrieved_articles(chunks, chunk_articles)
+        expected = set(item["articles"])
+        recalls.append(len(expected.intersection(articles)) / len(expected))
+
+        rank = next((i + 1 for i, article in enumerate(articles) if article in expected), None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        if rank is None:
+            misses.append({"question": item["question"], "expected": item["articles"], "retrieved": articles})
+
+    return {
+        f"recall@{k}": float(np.mean(recalls)),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "questions": len(golden),
+        "misses": misses
+    }
+
+
+def answer(manager: EmbeddingManager, client: OllamaClient, question: str, k: int, timings: dict) -> str:
+    """One search plus generation, recording each stage"""
+    start = time.perf_counter()
+    chunks, _ = manager.search(question, k)
+    searched = time.perf_counter()
+
+    stats = {}
+    response = client.generate_rag_response(question, chunks, stats)
+    end = time.perf_counter()
+
+    timings["search"].append(searched - start)
+    timings["generation"].append(end - searched)
+    timings["end_to_end"].append(end - start)
+    timings["modes"].append(stats.get("mode"))
+    return response
+
+
+def run_load(manager: EmbeddingManager, client: OllamaClient, golden: list, k: int,
+             requests: int, concurrency: int) -> dict:
+    """Issue requests end-to-end questions from concurrency threads"""
+    timings = {"search": [], "generation": [], "end_to_end": [], "modes": []}
+    questions = [golden[i % len(golden)]["question"] for i in range(requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda question: answer(manager, client, question, k, timings), questions))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "requests_per_sec": requests / elapsed,
+        "fallbacks": timings["modes"].count("fallback"),
+        "latency_ms": {stage: percentiles(timings[stage]) for stage in ("search", "generation", "end_to_end")}
+    }
+
+
+def headline_metrics(results: dict) -> dict:
+    """Flat name -> value view of the numbers worth comparing between runs"""
+    metrics = {name: value for name, value in results["retrieval"].items() if isinstance(value, float)}
+    metrics.update({f"{stage} p95 ms": latency["p95"] for stage, latency in results["stages_ms"].items()})
+    for run in results["throughput"]:
+        metrics[f"req/s @{run['concurrency']}"] = run["requests_per_sec"]
+        metrics[f"end_to_end p99 ms @{run['concurrency']}"] = run["latency_ms"]["end_to_end"]["p99"]
+    metrics["peak RSS MB"] = results["peak_rss_mb"]
+    return metrics
+
+
+def print_comparison(results: dict, baseline_path: str):
+    """Print each headline metric next to the baseline run"""
+    with open(baseline_path) as f:
+        baseline = headline_metrics(json.load(f))
+
+    print(f"\n{'metric':>28} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, value in headline_metrics(results).items():
+        if name in baseline:
+            before = baseline[name]
+            change = f"{(value - before) / before * 100:+.1f}%" if before else "n/a"
+            print(f"{name:>28} {before:>10.3f} {value:>10.3f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--document", default=DEFAULT_PDF_PATH)
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="JSON list of {question, articles}")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--first-token-delay", type=float, default=0.05, help="Stub prefill time in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Stub seconds per generated token")
+    parser.add_argument("--output", default="benchmark_rag_results.json")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    with open(args.golden) as f:
+        golden = json.load(f)
+
+    stage_timings = {"search": []}
+
+    # Build the index the way the app does
+    start = time.perf_counter()
+    processor = DocumentProcessor()
+    chunks = processor.process_document(args.document)
+    chunk_time = time.perf_counter() - start
+
+    manager = EmbeddingManager()
+    start = time.perf_counter()
+    manager.load_model()
+    model_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    manager.create_embeddings(chunks, processor.chunk_metadata)
+    manager.create_faiss_index()
+    index_time = time.perf_counter() - start
+
+    chunk_articles = {chunk: meta.get("article") for chunk, meta in zip(manager.chunks, manager.chunk_metadata)}
+
+    manager.search("warm up", args.k)
+    retrieval = evaluate_retrieval(manager, golden, chunk_articles, args.k, stage_timings)
+    print(f"🎯 recall@{args.k} {retrieval[f'recall@{args.k}']:.3f} · MRR {retrieval['mrr']:.3f} "
+          f"over {retrieval['questions']} questions")
+    for miss in retrieval["misses"]:
+        print(f"   missed: {miss['question']} (expected {', '.join(miss['expected'])})")
+
+    server, base_url = start_stub_server(token_delay=args.token_delay, first_token_delay=args.first_token_delay)
+    client = OllamaClient(base_url=base_url, pool_size=max(args.concurrency))
+
+    print(f"\n{'concurrency':>12} {'req/s':>8} {'e2e p50':>9} {'e2e p95':>9} {'e2e p99':>9} {'fallbacks':>10}")
+    throughput = []
+    for concurrency in args.concurrency:
+        run = run_load(manager, client, golden, args.k, args.requests, concurrency)
+        latency = run["latency_ms"]["end_to_end"]
+        print(f"{concurrency:>12} {run['requests_per_sec']:>8.2f} {latency['p50']:>7.1f}ms "
+              f"{latency['p95']:>7.1f}ms {latency['p99']:>7.1f}ms {run['fallbacks']:>10}")
+        throughput.append(run)
+    server.shutdown()
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "document": os.path.basename(args.document),
+            "chunks": len(manager.chunks),
+            "embedding_model": EMBEDDING_MODEL,
+            "index_type": FAISS_INDEX_TYPE,
+            "hybrid": HYBRID_SEARCH_ENABLED,
+            "k": args.k,
+            "first_token_delay": args.first_token_delay,
+            "token_delay": args.token_delay
+        },
+        "build_seconds": {"chunking": chunk_time, "model_load": model_time, "indexing": index_time},
+        "retrieval": retrieval,
+        # Search latency of the single-threaded evaluation pass
+        "stages_ms": {"search": percentiles(stage_timings["search"]),
+                      "generation": throughput[0]["latency_ms"]["generation"] if throughput else percentiles([]),
+                      "end_to_end": throughput[0]["latency_ms"]["end_to_end"] if throughput else percentiles([])},
+        "throughput": throughput,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+    print(f"\n⏱️ search p50 {results['stages_ms']['search']['p50']:.1f}ms · "
+          f"p95 {results['stages_ms']['search']['p95']:.1f}ms · p99 {results['stages_ms']['search']['p99']:.1f}ms")
+    print(f"💾 Peak RSS {results['peak_rss_mb']:.1f} MB")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
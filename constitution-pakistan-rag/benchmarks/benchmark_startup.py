@@ -0,0 +1,96 @@
+# benchmark_startup.py
+"""Measure how long the app takes to import and to become ready
+
+Each measurement runs in a fresh interpreter so module caches do not
+carry over between runs:
+
+    import    time to `import rag_system`, and which heavy modules it pulled in
+    ready     time from process start until the first query can be answered
+              (BM25 while the model loads) and until full initialization
+
+    python benchmarks/benchmark_startup.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["fitz", "streamlit", "sentence_transformers", "torch", "faiss"]
+
+
+def child_import() -> dict:
+    """Import the RAG system and report the time and the heavy modules loaded"""
+    start = time.perf_counter()
+    import rag_system  # noqa: F401
+    elapsed = time.perf_counter() - start
+    return {"import_seconds": elapsed, "loaded": [name for name in HEAVY_MODULES if name in sys.modules]}
+
+
+def child_ready(query: str) -> dict:
+    """Start the RAG system and time the first answerable query and full readiness"""
+    start = time.perf_counter()
+    from rag_system import RAGSystem
+    rag = RAGSystem()
+
+    if not hasattr(rag, "start_warmup"):
+        # Trees without background warm-up initialize synchronously
+        rag.initialize_system()
+        first_query = time.perf_counter() - start
+        rag.search(query)
+        return {"first_query_seconds": first_query, "ready_seconds": time.perf_counter() - start}
+
+    rag.start_warmup()
+    first_query = None
+    while not rag.initialized and rag.warmup_error is None:
+        if first_query is None and rag.searchable:
+            rag.search(query)
+            first_query = time.perf_counter() - start
+        time.sleep(0.005)
+    ready = time.perf_counter() - start
+    return {"first_query_seconds": first_query if first_query is not None else ready, "ready_seconds": ready}
+
+
+def run_child(mode: str, query: str) -> dict:
+    """Run one measurement in a fresh interpreter"""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, "--query", query],
+                            cwd=PROJECT_DIR, capture_output=True, text=True, check=True).stdout
+    # The result is the last line; the app prints its status messages before it
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median(results: list, key: str) -> float:
+    return float(np.median([result[key] for result in results]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--query", default="What is the state religion of Pakistan?")
+    parser.add_argument("--child", choices=["import", "ready"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, PROJECT_DIR)
+        result = child_import() if args.child == "import" else child_ready(args.query)
+        print(json.dumps(result))
+        return
+
+    imports = [run_child("import", args.query) for _ in range(args.runs)]
+    print(f"📦 import rag_system: median {median(imports, 'import_seconds') * 1000:.0f} ms over {args.runs} runs")
+    print(f"   heavy modules loaded at import: {', '.join(imports[0]['loaded']) or 'none'}")
+
+    # The first run may build the index; later runs measure the warm start
+    run_child("ready", args.query)
+    ready = [run_child("ready", args.query) for _ in range(args.runs)]
+    print(f"⏱️ first query answerable: median {median(ready, 'first_query_seconds'):.2f}s")
+    print(f"✅ fully ready: median {median(ready, 'ready_seconds'):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
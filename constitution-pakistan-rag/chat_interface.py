@@ -5,14 +5,19 @@ import streamlit as st
 from datetime import datetime
 import re
 from typing import List
+from config import SIMILARITY_THRESHOLD
+from telemetry import telemetry
 
 class ChatInterface:
     def __init__(self):
         """Initialize chat interface"""
         if "chat_history" not in st.session_state:
             st.session_state.chat_history = []
+        # Messages already sent to the model, replayed so Ollama reuses their prefill
+        if "llm_messages" not in st.session_state:
+            st.session_state.llm_messages = []
     
-    def render_chat_interface(self, qa_system, retrieval_k=5, similarity_threshold=1.0):
+    def render_chat_interface(self, qa_system, retrieval_k=5, similarity_threshold=SIMILARITY_THRESHOLD):
         """Render the main chat interface"""
         # Chat input
         user_query = st.chat_input("💬 Ask about the Constitution...")
@@ -23,7 +28,8 @@ class ChatInterface:
             del st.session_state.current_question
         
         if user_query:
-            self.process_user_query(user_query, qa_system, retrieval_k, similarity_threshold)
+            with telemetry.trace("chat", query=user_query, k=retrieval_k):
+                self.process_user_query(user_query, qa_system, retrieval_k, similarity_threshold)
         
         # Display chat history
         self.display_chat_history()
@@ -38,61 +44,112 @@ class ChatInterface:
         
         # Generate response
         with st.chat_message("assistant"):
+            # Repeated questions skip retrieval and generation entirely; answers to
+            # follow-ups depend on this session's history, so only opening questions are shared
+            cache_params = (retrieval_k, similarity_threshold)
+            use_cache = not st.session_state.llm_messages
+            cached = qa_system.get_cached_answer(query, cache_params) if use_cache else None
+            if cached is not None:
+                self.display_cached_answer(query, timestamp, cached)
+                qa_system.ollama_client.remember_turn(st.session_state.llm_messages, query, cached[0])
+                return
+            
             st.markdown("🔍 **Searching Constitution...**")
             
             with st.spinner("Finding relevant sections..."):
                 try:
-                    # Get relevant chunks
-                    relevant_chunks, scores = qa_system.embedding_manager.search(query, k=retrieval_k)
+                    # Get relevant chunks; FAISS applies the cosine threshold
+                    filtered_chunks, filtered_scores = qa_system.search(query, k=retrieval_k,
+                                                                        threshold=similarity_threshold)
                     
-                    if relevant_chunks:
-                        # Filter by similarity threshold
-                        filtered_chunks = []
-                        filtered_scores = []
+                    if filtered_chunks:
+                        st.success(f"✅ Found {len(filtered_chunks)} relevant sections!")
                         
-                        for chunk, score in zip(relevant_chunks, scores):
-                            if score <= similarity_threshold:
-                                filtered_chunks.append(chunk)
-                                filtered_scores.append(score)
+                        # Show sources
+                        self.display_sources(filtered_chunks, filtered_scores)
                         
-                        if filtered_chunks:
-                            st.success(f"✅ Found {len(filtered_chunks)} relevant sections!")
-                            
-                            # Show sources
-                            st.markdown("📚 **Sources:**")
-                            for i, (chunk, score) in enumerate(zip(filtered_chunks, filtered_scores)):
-                                title = self.extract_title(chunk)
-                                with st.expander(f"📖 {title} (Score: {score:.3f})"):
-                                    st.markdown(chunk[:500] + "..." if len(chunk) > 500 else chunk)
+                        # Generate AI response
+                        st.markdown("---")
+                        st.markdown("🤖 **AI Response:**")
+                        
+                        # Render tokens as they stream in
+                        placeholder = st.empty()
+                        stream_stats = {}
+                        answer = ""
+                        
+                        for piece in qa_system.ollama_client.stream_rag_response(query, filtered_chunks, stream_stats,
+                                                                                 st.session_state.llm_messages):
+                            answer += piece
+                            placeholder.markdown(f"**{answer}** ▌")
+                        
+                        if answer:
+                            placeholder.markdown(f"**{answer}**")
+                            st.caption(self.format_stream_stats(stream_stats))
                             
-                            # Generate AI response
-                            st.markdown("---")
-                            st.markdown("🤖 **AI Response:**")
+                            # Fallback and cut-off answers are not worth serving again
+                            if use_cache and stream_stats.get("mode") == "stream":
+                                qa_system.cache_answer(query, cache_params, answer, filtered_chunks, filtered_scores)
                             
-                            with st.spinner("Generating answer..."):
-                                answer = qa_system.ollama_client.generate_rag_response(query, filtered_chunks)
-                                
-                                if answer:
-                                    st.markdown(f"**{answer}**")
-                                    
-                                    # Save to chat history
-                                    st.session_state.chat_history.append({
-                                        "timestamp": timestamp,
-                                        "query": query,
-                                        "answer": answer,
-                                        "sources": filtered_chunks,
-                                        "scores": filtered_scores
-                                    })
-                                else:
-                                    st.error("❌ Failed to generate response")
+                            # Save to chat history
+                            st.session_state.chat_history.append({
+                                "timestamp": timestamp,
+                                "query": query,
+                                "answer": answer,
+                                "sources": filtered_chunks,
+                                "scores": filtered_scores,
+                                "stats": stream_stats
+                            })
                         else:
-                            st.warning(f"⚠️ No sections met the similarity threshold ({similarity_threshold})")
+                            placeholder.error("❌ Failed to generate response")
                     else:
-                        st.warning("⚠️ No relevant sections found")
+                        st.warning(f"⚠️ No sections met the similarity threshold ({similarity_threshold})")
                 
                 except Exception as e:
                     st.error(f"❌ Error: {str(e)}")
     
+    def display_sources(self, chunks: list, scores: list):
+        """Display source chunks with their scores"""
+        st.markdown("📚 **Sources:**")
+        for chunk, score in zip(chunks, scores):
+            title = self.extract_title(chunk)
+            with st.expander(f"📖 {title} (Score: {score:.3f})"):
+                st.markdown(chunk[:500] + "..." if len(chunk) > 500 else chunk)
+    
+    def display_cached_answer(self, query: str, timestamp: str, cached: tuple):
+        """Display an answer served from the answer cache"""
+        answer, chunks, scores = cached
+        
+        st.success(f"✅ Found {len(chunks)} relevant sections!")
+        self.display_sources(chunks, scores)
+        
+        st.markdown("---")
+        st.markdown("🤖 **AI Response:**")
+        st.markdown(f"**{answer}**")
+        st.caption("⚡ Served from cache")
+        
+        st.session_state.chat_history.append({
+            "timestamp": timestamp,
+            "query": query,
+            "answer": answer,
+            "sources": chunks,
+            "scores": scores,
+            "stats": {"mode": "cache"}
+        })
+    
+    def format_stream_stats(self, stats: dict) -> str:
+        """Format streaming latency stats for display"""
+        if stats.get("mode") == "fallback":
+            return f"⚡ Fallback answer in {stats.get('total_time', 0):.2f}s"
+        
+        ttft = stats.get("time_to_first_token") or 0.0
+        caption = (f"⚡ First token {ttft:.2f}s · {stats.get('tokens_per_sec', 0):.1f} tokens/s · "
+                   f"{stats.get('total_time', 0):.2f}s total")
+        if stats.get("truncated"):
+            caption += " · cut off at the latency budget"
+        elif stats.get("mode") == "partial":
+            caption += " · interrupted"
+        return caption
+    
     def extract_title(self, chunk: str) -> str:
         """Extract title from chunk"""
         title_match = re.search(r'(Article\s+\d+[A-Z]?|PART\s+[IVXLCDM]+)', chunk)
@@ -16,11 +16,39 @@ for directory in [DATA_DIR, EMBEDDINGS_DIR, CACHE_DIR]:
 # Document Processing
 DEFAULT_PDF_PATH = os.path.join(BASE_DIR, "sample_constitution.txt")
 CHUNK_MIN_LENGTH = 100
+CHUNK_TOKEN_BUDGET = 200  # whitespace tokens per chunk before an article is split
+CHUNK_TOKEN_OVERLAP = 30  # tokens repeated between consecutive splits
+EXPAND_TO_ARTICLE = False  # widen search hits to their whole article
+PDF_EXTRACT_WORKERS = os.cpu_count() or 1  # processes extracting PDF pages
+PDF_PAGES_PER_TASK = 32  # pages handed to a worker at a time
+PDF_PARALLEL_MIN_PAGES = 64  # smaller PDFs are extracted in-process
+
+# Multi-document corpus (set CORPUS_DIR to index every PDF/text file in it)
+CORPUS_DIR = None
+SHARDS_DIR = os.path.join(EMBEDDINGS_DIR, "shards")
+SHARD_SEARCH_WORKERS = 4
 
 # Ollama Configuration
 OLLAMA_BASE_URL = "http://localhost:11434"
 OLLAMA_MODEL = "deepseek-coder:latest"
-OLLAMA_TIMEOUT = 120
+OLLAMA_TIMEOUT = 120  # read timeout for generation
+OLLAMA_CONNECT_TIMEOUT = 5
+OLLAMA_POOL_SIZE = 10
+OLLAMA_MAX_RETRIES = 3
+OLLAMA_RETRY_BACKOFF = 0.5  # seconds, doubled on each retry
+OLLAMA_HEALTH_TTL = 30  # seconds a cached health/model-list result stays fresh
+OLLAMA_MAX_CONCURRENT_GENERATIONS = 4  # async pipeline cap on in-flight generations
+OLLAMA_CHAT_MODE = True  # /api/chat with a fixed system message and per-session history
+OLLAMA_KEEP_ALIVE = "30m"  # how long Ollama keeps the model loaded after a request
+CHAT_HISTORY_TURNS = 4  # earlier question/answer pairs sent with each question
+# Fixed context window; Ollama's default (2048) silently drops the start of longer prompts,
+# and changing it between requests reloads the model
+OLLAMA_NUM_CTX = 8192
+GENERATION_LATENCY_BUDGET = 60  # seconds before the extractive fallback answers instead
+
+# Fallback Answers (extractive, used when generation fails or runs over budget)
+FALLBACK_MAX_SENTENCES = 3
+FALLBACK_EMBEDDING_WEIGHT = 0.5  # rest of the sentence score is query-term coverage
 
 # Model Parameters
 TEMPERATURE = 0.3
@@ -28,4 +56,75 @@ TOP_P = 0.9
 MAX_TOKENS = 500
 
 # Embedding Model
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"
\ No newline at end of file
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+BACKGROUND_WARMUP = True  # load the model and index in a background thread when the app starts
+
+# Retrieval (vectors are L2-normalized, so scores are cosine similarities)
+SIMILARITY_THRESHOLD = 0.3
+
+# Hybrid Retrieval (BM25 postings fused with dense hits by reciprocal rank)
+HYBRID_SEARCH_ENABLED = True
+HYBRID_CANDIDATES = 50  # hits taken from each ranking before fusion
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+
+# Reference Lookup ("Article 25A", "Article 184(3)", "PART II" resolved without embeddings)
+REFERENCE_LOOKUP_ENABLED = True
+REFERENCE_LOOKUP_EXCLUSIVE = True  # skip semantic search when a query names a reference
+
+# Re-ranking (a cross-encoder re-scores an over-fetched candidate set)
+RERANK_ENABLED = False
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_CANDIDATES = 20  # hits fetched before re-ranking down to k
+RERANK_BATCH_SIZE = 16
+RERANK_TOKEN_BUDGET = 1200  # whitespace tokens across the kept chunks
+RERANK_CACHE_SIZE = 4096  # (query, chunk) scores
+
+# Context Packing (deduplicated, query-trimmed chunks under a prompt token budget)
+CONTEXT_PACKING_ENABLED = True
+CONTEXT_TOKEN_BUDGET = 800
+CONTEXT_CHUNK_MAX_TOKENS = 300  # longer chunks keep only their most relevant sentences
+CONTEXT_DEDUP_THRESHOLD = 0.8  # share of word trigrams already packed
+
+# Vector Index
+FAISS_INDEX_TYPE = "flat"  # "flat", "ivf_flat", "ivf_pq" or "hnsw"
+IVF_NLIST = 100  # inverted lists (capped for small corpora)
+IVF_NPROBE = 8  # lists scanned per query
+PQ_M = 16  # PQ sub-quantizers (must divide the embedding dimension)
+PQ_NBITS = 8
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+VECTOR_QUANTIZATION = "none"  # "none", "fp16" or "int8" vectors inside flat/IVF-Flat/HNSW indexes
+RESCORE_FACTOR = 4  # quantized search fetches k * this many candidates for exact re-scoring
+
+# Query Batching (concurrent searches share one encode/search call)
+QUERY_BATCHING_ENABLED = True
+QUERY_BATCH_MAX_SIZE = 32
+QUERY_BATCH_MAX_WAIT_MS = 2
+
+# Answer Cache
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_SIZE = 256
+ANSWER_CACHE_TTL = 3600  # seconds
+SEMANTIC_CACHE_ENABLED = False  # also match paraphrases by query embedding
+SEMANTIC_CACHE_MAX_DISTANCE = 0.05  # cosine distance
+
+# Telemetry (spans, counters and histograms; Prometheus text on /metrics)
+TELEMETRY_ENABLED = True
+METRICS_PORT = 9464  # None disables the local metrics endpoint
+METRICS_HOST = "127.0.0.1"
+SLOW_QUERY_THRESHOLD = 5.0  # seconds; slower requests are logged with their span breakdown
+SLOW_QUERY_LOG = os.path.join(CACHE_DIR, "slow_queries.jsonl")
+
+# API Server (api_server.py, no Streamlit)
+API_HOST = "127.0.0.1"
+API_PORT = 8000
+API_WORKERS = 1  # processes sharing the port, each loading its own model and index
+API_MAX_BATCH = 64  # queries accepted by one /batch request
+
+# Index Storage
+INDEX_DIR = os.path.join(EMBEDDINGS_DIR, "constitution_index")
+INDEX_FORMAT_VERSION = 5
+VECTOR_STORAGE_DTYPE = "float32"  # "float32" or "float16"
\ No newline at end of file
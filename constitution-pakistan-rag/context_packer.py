@@ -0,0 +1,103 @@
+# context_packer.py
+"""Pack retrieved chunks into a token-budgeted prompt context
+
+Neighbouring chunks of a long article overlap, and expanded hits repeat
+whole articles, so the packer drops chunks that are near-duplicates of
+ones already packed and sentences already seen. Chunks too long for
+their share of the budget keep the sentences most relevant to the query.
+"""
+
+import re
+from sparse_index import tokenize
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_CHUNK_MAX_TOKENS, CONTEXT_DEDUP_THRESHOLD
+
+# Word pieces and single punctuation marks, close to what a BPE tokenizer produces for legal text
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+# Sentence ends, clause semicolons and line breaks all make good cut points
+SENTENCE_PATTERN = re.compile(r'(?<=[.;])\s+|\n+')
+# Chunks below this many remaining tokens are not worth a section of their own
+MIN_SECTION_TOKENS = 16
+SHINGLE_SIZE = 3
+
+STOPWORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how",
+    "in", "is", "it", "of", "on", "or", "say", "says", "the", "to", "what", "which", "who", "with"
+))
+
+
+def count_tokens(text: str) -> int:
+    """Approximate LLM token count of a text"""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def _shingles(text: str) -> set:
+    """Word trigrams used to spot near-duplicate chunks"""
+    words = tokenize(text)
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+
+
+def _sentence_key(sentence: str) -> str:
+    return " ".join(tokenize(sentence))
+
+
+def _trim_to_relevant(sentences: list, query_terms: set, limit: int) -> list:
+    """Keep the sentences that best match the query within limit tokens, in text order"""
+    counts = [count_tokens(sentence) for sentence in sentences]
+
+    def relevance(i):
+        # The first sentence carries the Article heading, so it ranks above any other
+        matched = len(query_terms.intersection(tokenize(sentences[i])))
+        return (i == 0, matched, -i)
+
+    kept, used = [], 0
+    for i in sorted(range(len(sentences)), key=relevance, reverse=True):
+        if used + counts[i] <= limit:
+            kept.append(i)
+            used += counts[i]
+    return [sentences[i] for i in sorted(kept)]
+
+
+def pack_context(query: str, chunks: list, token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 chunk_max_tokens: int = CONTEXT_CHUNK_MAX_TOKENS,
+                 dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD) -> list:
+    """Deduplicated, trimmed chunks in rank order whose total fits token_budget"""
+    query_terms = set(tokenize(query)) - STOPWORDS
+    packed, packed_shingles, seen_sentences = [], [], set()
+    remaining = token_budget
+
+    for chunk in chunks:
+        if remaining < MIN_SECTION_TOKENS:
+            break
+
+        # Skip chunks mostly contained in one already packed
+        shingles = _shingles(chunk)
+        if any(len(shingles & other) >= dedup_threshold * min(len(shingles), len(other))
+               for other in packed_shingles):
+            continue
+
+        # Overlapping windows share sentences; each goes into the prompt once, but the
+        # first line is kept so continuation windows still name their Article
+        sentences, repeated = [], False
+        for i, sentence in enumerate(SENTENCE_PATTERN.split(chunk.strip())):
+            key = _sentence_key(sentence)
+            if key in seen_sentences and i > 0:
+                repeated = True
+            elif key:
+                sentences.append(sentence.strip())
+        if not sentences or (repeated and len(sentences) == 1):
+            continue
+
+        limit = min(remaining, chunk_max_tokens)
+        text = "\n".join(sentences) if repeated else chunk.strip()
+        if count_tokens(text) > limit:
+            sentences = _trim_to_relevant(sentences, query_terms, limit)
+            if not sentences:
+                continue
+            text = "\n".join(sentences)
+
+        packed.append(text)
+        packed_shingles.append(shingles)
+        seen_sentences.update(_sentence_key(sentence) for sentence in sentences)
+        remaining -= count_tokens(text)
+
+    return packed
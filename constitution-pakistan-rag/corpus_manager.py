@@ -0,0 +1,232 @@
+# corpus_manager.py
+"""Multi-document corpus with one index shard per document"""
+
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from document_processor import DocumentProcessor
+from embedding_manager import EmbeddingManager
+from index_store import compute_corpus_hash, read_manifest
+from reference_index import find_parts
+from telemetry import telemetry
+from config import CORPUS_DIR, SHARDS_DIR, SHARD_SEARCH_WORKERS
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt')
+FILTER_FIELDS = ("part", "article")
+
+
+class CorpusManager:
+    """Ingests a directory of documents and searches across their shards
+
+    Every document gets its own index directory under shards_dir, so adding
+    or amending one document never touches the others. Chunk metadata
+    (document id, Part, Article, page) lets filters prune whole shards
+    before searching, and restrict the remaining ones inside FAISS.
+    """
+
+    def __init__(self, corpus_dir: str = CORPUS_DIR, shards_dir: str = SHARDS_DIR, model=None):
+        self.corpus_dir = corpus_dir
+        self.shards_dir = shards_dir
+        self.model = model
+        self.shards = {}  # document id -> EmbeddingManager
+        self.shard_fields = {}  # document id -> {field: {value: [chunk ids]}}
+        self.corpus_hash = None
+        self._executor = ThreadPoolExecutor(max_workers=SHARD_SEARCH_WORKERS, thread_name_prefix="shard-search")
+
+    def ingest(self) -> dict:
+        """Bring every shard in line with the corpus directory"""
+        if self.model is None:
+            manager = EmbeddingManager()
+            manager.load_model()
+            self.model = manager.model
+
+        os.makedirs(self.shards_dir, exist_ok=True)
+        stats = {"loaded": 0, "updated": 0, "removed": 0}
+
+        documents = self._discover_documents()
+        shards = {}
+
+        for doc_id, path in documents.items():
+            shard_dir = os.path.join(self.shards_dir, doc_id)
+            manager, updated = self._load_or_build_shard(doc_id, path, shard_dir)
+            shards[doc_id] = manager
+            stats["updated" if updated else "loaded"] += 1
+
+        # Drop shards whose documents have been removed
+        for name in os.listdir(self.shards_dir):
+            if name not in documents and os.path.isdir(os.path.join(self.shards_dir, name)):
+                shutil.rmtree(os.path.join(self.shards_dir, name))
+                stats["removed"] += 1
+
+        self.shards = shards
+        self.shard_fields = {doc_id: self._index_fields(manager) for doc_id, manager in shards.items()}
+        self.corpus_hash = compute_corpus_hash(
+            [f"{doc_id}:{shards[doc_id].corpus_hash}" for doc_id in sorted(shards)])
+
+        print(f"✅ Corpus ready: {len(shards)} documents "
+              f"({stats['loaded']} cached, {stats['updated']} indexed, {stats['removed']} removed)")
+        return stats
+
+    def search(self, query: str, k: int = 5, threshold: float = None, filters: dict = None,
+               expand: bool = False) -> tuple:
+        """Search all matching shards in parallel and merge the top k
+
+        filters may contain "document", "part" (e.g. "PART II") and "article"
+        (e.g. "Article 25A"), each a single value or a list of them. With expand, hits are widened to their
+        whole article. Returns (chunks, scores, metadata).
+        """
+        filters = filters or {}
+        candidates = self._select_shards(filters)
+        if not candidates:
+            return [], [], []
+
+        with telemetry.span("query_encode"):
+            query_embedding = next(iter(candidates.values())).encode_queries([query])
+
+        def search_shard(item):
+            doc_id, manager = item
+            allowed_ids = self._allowed_ids(doc_id, filters)
+            if allowed_ids is not None and not allowed_ids:
+                return []
+
+            # Hybrid shards are merged on their fusion score, so BM25-only matches keep their rank
+            if manager.hybrid and manager.sparse_index is not None:
+                ids, scores, ranking = manager.hybrid_search(query, query_embedding[0], k, threshold, allowed_ids)
+            else:
+                ids, scores = manager.search_vectors(query_embedding, k, threshold, allowed_ids)[0]
+                ranking = scores
+            return [(rank, score, doc_id, idx) for idx, score, rank in zip(ids, scores, ranking)]
+
+        # FAISS releases the GIL, so shards really are searched concurrently
+        with telemetry.span("index_search"):
+            hits = [hit for shard_hits in self._executor.map(search_shard, candidates.items()) for hit in shard_hits]
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        with telemetry.span("filtering"):
+            return self._collect([hit[1:] for hit in hits], k, expand)
+
+    def named_parts(self, query: str) -> list:
+        """Parts named in the query that some shard contains, usable as a "part" filter"""
+        return [label for label in find_parts(query)
+                if any(label in fields["part"] for fields in self.shard_fields.values())]
+
+    def lookup_references(self, query: str, k: int = 5, filters: dict = None, expand: bool = False) -> tuple:
+        """Chunks for Articles/clauses named in the query, found without encoding it"""
+        filters = filters or {}
+        hits = []
+        for doc_id, manager in self._select_shards(filters).items():
+            ids = manager.resolve_references(query, self._allowed_ids(doc_id, filters))
+            hits.extend((1.0, doc_id, idx) for idx in ids)
+        return self._collect(hits, k, expand)
+
+    def close(self):
+        """Stop the shard search threads once this manager has been replaced"""
+        self._executor.shutdown(wait=False)
+
+    def get_corpus_stats(self) -> dict:
+        """Get per-document chunk counts"""
+        return {
+            "documents": len(self.shards),
+            "total_chunks": sum(len(manager.chunks) for manager in self.shards.values()),
+            "chunks_per_document": {doc_id: len(manager.chunks) for doc_id, manager in self.shards.items()}
+        }
+
+    def _collect(self, hits: list, k: int, expand: bool) -> tuple:
+        """Turn ranked (score, document id, chunk id) hits into chunks, scores and metadata"""
+        chunks, scores, metadata, seen = [], [], [], set()
+        for score, doc_id, idx in hits:
+            if len(chunks) == k:
+                break
+            manager = self.shards[doc_id]
+            if expand:
+                span = (doc_id, manager.article_span(idx))
+                if span in seen:
+                    continue
+                seen.add(span)
+            chunks.append(manager.expand_to_article(idx) if expand else manager.chunks[idx])
+            scores.append(score)
+            metadata.append(dict(manager.chunk_metadata[idx], document=doc_id))
+
+        return chunks, scores, metadata
+
+    def _discover_documents(self) -> dict:
+        """Map document ids to source files in the corpus directory
+
+        Ids are slugs of the file names, so two files that differ only in
+        extension or punctuation (constitution.pdf, Constitution.txt) would
+        share a shard; that raises a ValueError naming both.
+        """
+        documents = {}
+        for name in sorted(os.listdir(self.corpus_dir)):
+            path = os.path.join(self.corpus_dir, name)
+            if os.path.isfile(path) and name.lower().endswith(SUPPORTED_EXTENSIONS):
+                doc_id = re.sub(r'[^a-z0-9]+', '-', os.path.splitext(name)[0].lower()).strip('-')
+                if doc_id in documents:
+                    raise ValueError(f"{os.path.basename(documents[doc_id])} and {name} both map to "
+                                     f"document id '{doc_id}'; rename one of them")
+                documents[doc_id] = path
+        return documents
+
+    def _load_or_build_shard(self, doc_id: str, path: str, shard_dir: str) -> tuple:
+        """Load a shard from disk, re-indexing it only if its document changed"""
+        processor = DocumentProcessor()
+        manager = EmbeddingManager(self.model)
+
+        manifest = read_manifest(shard_dir)
+        loaded = manager.load_embeddings(shard_dir)
+        if (loaded and manifest is not None and processor.matches_manifest(manifest, path)
+                and manager.corpus_hash == manifest.get("corpus_hash")):
+            return manager, False
+
+        print(f"📄 Indexing {doc_id}...")
+        chunks = processor.process_document(path)
+        manager.update_embeddings(chunks, processor.chunk_metadata)
+
+        manifest = processor.build_manifest(path)
+        manifest["corpus_hash"] = manager.corpus_hash
+        manager.save_embeddings(shard_dir, manifest)
+        return manager, True
+
+    def _select_shards(self, filters: dict) -> dict:
+        """Prune shards that cannot match the document/Part filters"""
+        documents = filter_values(filters, "document")
+
+        selected = {}
+        for doc_id, manager in self.shards.items():
+            if documents is not None and doc_id not in documents:
+                continue
+            fields = self.shard_fields[doc_id]
+            if any(filter_values(filters, field) is not None
+                   and not any(value in fields[field] for value in filter_values(filters, field))
+                   for field in FILTER_FIELDS):
+                continue
+            selected[doc_id] = manager
+        return selected
+
+    def _allowed_ids(self, doc_id: str, filters: dict):
+        """Chunk rows matching the Part/Article filters, or None if unfiltered"""
+        allowed = None
+        for field in FILTER_FIELDS:
+            values = filter_values(filters, field)
+            if values is not None:
+                ids = set().union(*(self.shard_fields[doc_id][field].get(value, []) for value in values))
+                allowed = ids if allowed is None else allowed & ids
+
+        return sorted(allowed) if allowed is not None else None
+
+    def _index_fields(self, manager: EmbeddingManager) -> dict:
+        """Precompute chunk ids per Part/Article value of a shard"""
+        fields = {field: {} for field in FILTER_FIELDS}
+        for idx, meta in enumerate(manager.chunk_metadata):
+            for field in FILTER_FIELDS:
+                if meta.get(field):
+                    fields[field].setdefault(meta[field], []).append(idx)
+        return fields
+
+
+def filter_values(filters: dict, field: str):
+    """Values a filter field allows as a list, or None if the field is not set"""
+    value = filters.get(field)
+    if not value:
+        return None
+    return [value] if isinstance(value, str) else list(value)
@@ -1,31 +1,57 @@
 # document_processor.py
 """Simple document processor for PDF and text files"""
 
-import re
 import os
-import fitz  # PyMuPDF
-from config import DEFAULT_PDF_PATH, CHUNK_MIN_LENGTH
+import hashlib
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from structural_chunker import StructuralChunker
+from reference_index import build_reference_index
+from config import DEFAULT_PDF_PATH, PDF_EXTRACT_WORKERS, PDF_PAGES_PER_TASK, PDF_PARALLEL_MIN_PAGES
+
+# Bump whenever chunk_document output changes so cached indexes are rebuilt
+CHUNKER_VERSION = 4
+
+
+def _extract_pages(pdf_path: str, start: int, end: int) -> list:
+    """Extract the text of pages [start, end), run inside a worker process"""
+    import fitz  # PyMuPDF
+    doc = fitz.open(pdf_path)
+    try:
+        return [doc[i].get_text() for i in range(start, end)]
+    finally:
+        doc.close()
+
 
 class DocumentProcessor:
     def __init__(self):
         """Initialize document processor"""
         self.text = ""
         self.chunks = []
-        self.full_text = ""
+        self.chunk_metadata = []
+        self.chunk_records = None  # structured array of structural_chunker.RECORD_DTYPE
+        self.section_labels = []
+        self.reference_index = {}  # "Article 25A" / "PART II" -> chunk ids
+    
+    def resolve_document_path(self, file_path: str = None) -> str:
+        """Resolve the file that load_document would read"""
+        if file_path is None:
+            file_path = DEFAULT_PDF_PATH
+        
+        if not os.path.exists(file_path):
+            # Try to find a text file instead
+            text_file = file_path.replace('.pdf', '.txt')
+            if os.path.exists(text_file):
+                return text_file
+            raise FileNotFoundError(f"Document file not found: {file_path}")
+        
+        return file_path
     
     def load_document(self, file_path: str = None) -> str:
         """Load document from PDF or text file"""
         try:
-            if file_path is None:
-                file_path = DEFAULT_PDF_PATH
-            
-            if not os.path.exists(file_path):
-                # Try to find a text file instead
-                text_file = file_path.replace('.pdf', '.txt')
-                if os.path.exists(text_file):
-                    return self.load_text_file(text_file)
-                else:
-                    raise FileNotFoundError(f"Document file not found: {file_path}")
+            file_path = self.resolve_document_path(file_path)
             
             # Check file extension
             if file_path.lower().endswith('.pdf'):
@@ -42,17 +68,9 @@ class DocumentProcessor:
     def load_pdf(self, pdf_path: str) -> str:
         """Load and extract text from PDF file"""
         try:
-            # Extract text from PDF
-            doc = fitz.open(pdf_path)
-            text = ""
-            
-            for page in doc:
-                text += page.get_text()
-            
-            doc.close()
+            text = "".join(page_text for _, page_text in self.iter_pdf_pages(pdf_path))
             
             # Store the full text
-            self.full_text = text
             self.text = text
             return text
             
@@ -67,7 +85,6 @@ class DocumentProcessor:
                 text = f.read()
             
             # Store the full text
-            self.full_text = text
             self.text = text
             return text
             
@@ -75,6 +92,81 @@ class DocumentProcessor:
             print(f"❌ Error loading text file: {e}")
             raise e
     
+    def process_document(self, file_path: str = None) -> list:
+        """Stream pages from the document straight into the chunker
+        
+        Unlike load_document followed by chunk_document, the full text is never
+        held in memory, and every chunk records the pages it came from.
+        """
+        try:
+            self.text = ""
+            return self.chunk_pages(self.iter_pages(file_path))
+        except Exception as e:
+            print(f"❌ Error processing document: {e}")
+            raise e
+    
+    def iter_pages(self, file_path: str = None):
+        """Yield (page number, text) pairs in order, starting at page 1"""
+        file_path = self.resolve_document_path(file_path)
+        
+        if file_path.lower().endswith('.pdf'):
+            yield from self.iter_pdf_pages(file_path)
+        elif file_path.lower().endswith('.txt'):
+            # Form feeds (as written by pdftotext) separate pages in text files
+            with open(file_path, 'r', encoding='utf-8') as f:
+                page_number, lines = 1, []
+                for line in f:
+                    while '\f' in line:
+                        before, line = line.split('\f', 1)
+                        lines.append(before)
+                        yield page_number, "".join(lines)
+                        page_number, lines = page_number + 1, []
+                    lines.append(line)
+                yield page_number, "".join(lines)
+        else:
+            raise ValueError(f"Unsupported file format: {file_path}")
+    
+    def iter_pdf_pages(self, pdf_path: str, workers: int = PDF_EXTRACT_WORKERS):
+        """Yield (page number, text) pairs, extracting page ranges in a process pool"""
+        # Imported on first use so text documents never load PyMuPDF
+        import fitz  # PyMuPDF
+        doc = fitz.open(pdf_path)
+        page_count = doc.page_count
+        
+        # Small documents are not worth the worker start-up cost
+        if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+            try:
+                for page_number, page in enumerate(doc, start=1):
+                    yield page_number, page.get_text()
+            finally:
+                doc.close()
+            return
+        doc.close()
+        
+        ranges = iter([(start, min(start + PDF_PAGES_PER_TASK, page_count))
+                       for start in range(0, page_count, PDF_PAGES_PER_TASK)])
+        
+        # Spawned workers are safe to start from Streamlit's threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            # Keep only a few ranges in flight so memory stays bounded for any page count
+            pending = deque()
+            for start, end in ranges:
+                pending.append((start, executor.submit(_extract_pages, pdf_path, start, end)))
+                if len(pending) >= workers * 2:
+                    break
+            
+            while pending:
+                start, future = pending.popleft()
+                texts = future.result()
+                
+                next_range = next(ranges, None)
+                if next_range is not None:
+                    pending.append((next_range[0], executor.submit(_extract_pages, pdf_path, *next_range)))
+                
+                for offset, text in enumerate(texts):
+                    yield start + offset + 1, text
+    
     def chunk_document(self, text: str = None) -> list:
         """Split document into meaningful chunks"""
         if text is None:
@@ -83,48 +175,68 @@ class DocumentProcessor:
         if not text:
             raise ValueError("No text to chunk")
         
-        # Split by Parts and Articles
-        chunks = re.split(r'(PART\s+[IVXLCDM]+|Article\s+\d+[A-Z]?)', text)
+        return self.chunk_pages([(1, text)])
+    
+    def chunk_pages(self, pages) -> list:
+        """Split (page number, text) pairs into chunks as they arrive"""
+        chunker = StructuralChunker()
+        processed_chunks = []
+        saw_text = False
         
-        final_chunks = []
-        for i in range(1, len(chunks), 2):
-            heading = chunks[i].strip()
-            body = chunks[i+1].strip() if i+1 < len(chunks) else ""
-            
-            if heading and body:
-                chunk = f"{heading}\n{body}"
-                if len(chunk.strip()) > CHUNK_MIN_LENGTH:
-                    final_chunks.append(chunk)
+        for page_number, text in pages:
+            saw_text = saw_text or bool(text.strip())
+            processed_chunks.extend(chunker.feed(text, page_number))
         
-        # Additional chunking for long sections
-        processed_chunks = []
-        for chunk in final_chunks:
-            if len(chunk) > 2000:  # Split very long chunks
-                sub_chunks = self._split_long_chunk(chunk)
-                processed_chunks.extend(sub_chunks)
-            else:
-                processed_chunks.append(chunk)
+        if not saw_text:
+            raise ValueError("No text to chunk")
+        processed_chunks.extend(chunker.finish())
         
         self.chunks = processed_chunks
+        self.chunk_records = chunker.records
+        self.section_labels = chunker.labels
+        self.chunk_metadata = [chunker.metadata(record) for record in self.chunk_records]
+        self.reference_index = build_reference_index(self.chunk_metadata)
         return processed_chunks
     
-    def _split_long_chunk(self, chunk: str, max_length: int = 1500) -> list:
-        """Split long chunks into smaller pieces"""
-        lines = chunk.split('\n')
-        current_chunk = ""
-        chunks = []
-        
-        for line in lines:
-            if len(current_chunk) + len(line) > max_length and current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = line + "\n"
-            else:
-                current_chunk += line + "\n"
+    def build_manifest(self, file_path: str = None) -> dict:
+        """Describe the source document so a cached index can be matched to it"""
+        file_path = self.resolve_document_path(file_path)
+        stat = os.stat(file_path)
         
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        return {
+            "source_path": os.path.abspath(file_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "content_hash": self._hash_file(file_path),
+            "chunker_version": CHUNKER_VERSION
+        }
+    
+    def matches_manifest(self, manifest: dict, file_path: str = None) -> bool:
+        """Check whether the source document is unchanged since the manifest was written"""
+        try:
+            file_path = self.resolve_document_path(file_path)
+            stat = os.stat(file_path)
+        except (FileNotFoundError, OSError):
+            return False
+        
+        if (manifest.get("source_path") != os.path.abspath(file_path)
+                or manifest.get("chunker_version") != CHUNKER_VERSION
+                or manifest.get("size") != stat.st_size):
+            return False
         
-        return chunks
+        if manifest.get("mtime") == stat.st_mtime:
+            return True
+        
+        # Touched but possibly identical, fall back to the content hash
+        return manifest.get("content_hash") == self._hash_file(file_path)
+    
+    def _hash_file(self, file_path: str) -> str:
+        """SHA-256 of a file's bytes"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
     
     def get_chunk_stats(self) -> dict:
         """Get statistics about the processed chunks"""
@@ -143,7 +255,7 @@ class DocumentProcessor:
     
     def get_full_text(self) -> str:
         """Get the full processed text"""
-        return self.full_text if hasattr(self, 'full_text') else ""
+        return self.text if hasattr(self, 'text') else ""
     
     def get_chunks(self) -> list:
         """Get the processed chunks"""
@@ -1,42 +1,128 @@
 # embedding_manager.py
 """Simple embedding manager for RAG chatbot"""
 
-import pickle
-import os
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from config import EMBEDDINGS_DIR, EMBEDDING_MODEL
+from config import (EMBEDDING_MODEL, FAISS_INDEX_TYPE, HYBRID_SEARCH_ENABLED, HYBRID_CANDIDATES,
+                    VECTOR_QUANTIZATION, RESCORE_FACTOR)
+from ann_index import build_index, rescore, search_params, set_search_params
+from index_store import compute_chunk_hash, compute_corpus_hash, load_index, open_vectors, save_index
+from sparse_index import BM25Index, reciprocal_rank_fusion
+from reference_index import build_reference_index, resolve_parts, resolve_references
+from structural_chunker import stitch_chunks
+from telemetry import telemetry
 
 class EmbeddingManager:
-    def __init__(self):
-        """Initialize embedding manager"""
-        self.model = None
+    def __init__(self, model=None):
+        """Initialize embedding manager (optionally sharing an already loaded model)"""
+        self.model = model
         self.embeddings = None
         self.chunks = []
+        self.chunk_metadata = []
         self.index = None
         self.model_name = EMBEDDING_MODEL
+        self.index_type = FAISS_INDEX_TYPE
+        # Quantized indexes re-score their top candidates from self.embeddings
+        self.quantization = VECTOR_QUANTIZATION
+        self.sparse_index = None
+        self.reference_index = {}
+        self.hybrid = HYBRID_SEARCH_ENABLED
+        self.corpus_hash = None
+        self.chunk_hashes = []
     
     def load_model(self):
         """Load the embedding model"""
         if self.model is None:
+            # Imported here: sentence-transformers pulls in torch, seconds of import time
+            from sentence_transformers import SentenceTransformer
             self.model = SentenceTransformer(self.model_name)
     
-    def create_embeddings(self, chunks: list):
+    def create_embeddings(self, chunks: list, metadata: list = None):
         """Create embeddings for chunks"""
         if not chunks:
             raise ValueError("No chunks provided")
         
         # Filter out empty chunks
-        valid_chunks = [chunk for chunk in chunks if chunk.strip()]
+        valid_chunks, valid_metadata = self._filter_chunks(chunks, metadata)
         if not valid_chunks:
             raise ValueError("No valid chunks after filtering")
         
         self.chunks = valid_chunks
+        self.chunk_metadata = valid_metadata
+        self.chunk_hashes = [compute_chunk_hash(chunk) for chunk in valid_chunks]
+        self.corpus_hash = compute_corpus_hash(valid_chunks)
+        self.sparse_index = BM25Index.build(valid_chunks)
+        self.reference_index = build_reference_index(valid_metadata)
         
         # Create embeddings
-        self.embeddings = self.model.encode(valid_chunks, show_progress_bar=True)
+        self.embeddings = normalize_vectors(self.model.encode(valid_chunks, show_progress_bar=True))
         print(f"✅ Created embeddings: {self.embeddings.shape}")
     
+    def update_embeddings(self, chunks: list, metadata: list = None) -> dict:
+        """Re-embed only new or changed chunks and drop deleted ones"""
+        if not chunks:
+            raise ValueError("No chunks provided")
+        
+        # Filter out empty chunks
+        valid_chunks, valid_metadata = self._filter_chunks(chunks, metadata)
+        if not valid_chunks:
+            raise ValueError("No valid chunks after filtering")
+        
+        new_hashes = [compute_chunk_hash(chunk) for chunk in valid_chunks]
+        
+        # Rows we can reuse from the current embeddings, keyed by content hash
+        existing_rows = {}
+        if self.embeddings is not None:
+            for row, chunk_hash in enumerate(self.chunk_hashes):
+                existing_rows.setdefault(chunk_hash, row)
+        
+        to_encode = [i for i, h in enumerate(new_hashes) if h not in existing_rows]
+        
+        dimension = self.embeddings.shape[1] if self.embeddings is not None else None
+        encoded = None
+        if to_encode:
+            encoded = normalize_vectors(self.model.encode([valid_chunks[i] for i in to_encode], show_progress_bar=True))
+            dimension = encoded.shape[1]
+        
+        # Assemble the new matrix in chunk order
+        embeddings = np.empty((len(valid_chunks), dimension), dtype=np.float32)
+        reused = [i for i, h in enumerate(new_hashes) if h in existing_rows]
+        if reused:
+            embeddings[reused] = self.embeddings[[existing_rows[new_hashes[i]] for i in reused]]
+        if to_encode:
+            embeddings[to_encode] = encoded
+        
+        removed = len(set(self.chunk_hashes) - set(new_hashes))
+        
+        self.chunks = valid_chunks
+        self.chunk_metadata = valid_metadata
+        self.chunk_hashes = new_hashes
+        self.corpus_hash = compute_corpus_hash(valid_chunks)
+        self.embeddings = embeddings
+        self.sparse_index = BM25Index.build(valid_chunks)
+        self.reference_index = build_reference_index(valid_metadata)
+        
+        # Rebuilding drops vectors of deleted chunks from the index
+        self.create_faiss_index()
+        
+        stats = {"reused": len(reused), "encoded": len(to_encode), "removed": removed}
+        print(f"✅ Embeddings updated: {stats['encoded']} encoded, {stats['reused']} reused, {stats['removed']} removed")
+        return stats
+    
+    def _filter_chunks(self, chunks: list, metadata: list = None) -> tuple:
+        """Drop empty chunks, keeping metadata aligned"""
+        if metadata is None:
+            metadata = [{} for _ in chunks]
+        
+        kept = [(chunk, meta) for chunk, meta in zip(chunks, metadata) if chunk.strip()]
+        return [chunk for chunk, _ in kept], [meta for _, meta in kept]
+    
+    def matches_chunks(self, chunks: list, metadata: list = None) -> bool:
+        """Check whether the current embeddings were built from these chunks (and metadata)"""
+        valid_chunks, valid_metadata = self._filter_chunks(chunks, metadata)
+        if metadata is not None and valid_metadata != self.chunk_metadata:
+            return False
+        return self.corpus_hash is not None and self.corpus_hash == compute_corpus_hash(valid_chunks)
+    
     def create_faiss_index(self, embeddings=None):
         """Create FAISS index"""
         if embeddings is None:
@@ -46,84 +132,245 @@ class EmbeddingManager:
             raise ValueError("No embeddings available")
         
         try:
-            import faiss
+            # Create, train and fill the configured index type
+            self.index = build_index(embeddings, self.index_type, self.quantization)
             
-            # Ensure embeddings are float32
-            embeddings = embeddings.astype(np.float32)
-            
-            # Create index
-            dimension = embeddings.shape[1]
-            self.index = faiss.IndexFlatIP(dimension)
-            self.index.add(embeddings)
-            
-            print(f"✅ FAISS index created: {self.index.ntotal} vectors")
+            print(f"✅ FAISS index created: {self.index.ntotal} vectors ({self.index_type}, "
+                  f"{self.quantization} vectors)")
             return self.index
             
         except Exception as e:
             print(f"❌ Error creating FAISS index: {e}")
             raise
     
-    def load_embeddings(self, filepath: str) -> bool:
-        """Load embeddings from file"""
+    def load_embeddings(self, directory: str) -> bool:
+        """Load embeddings, chunks and FAISS index from an index directory"""
         try:
-            if os.path.exists(filepath):
-                with open(filepath, 'rb') as f:
-                    data = pickle.load(f)
-                    self.embeddings = data['embeddings']
-                    self.chunks = data['chunks']
-                    
-                    # Recreate FAISS index
-                    if self.embeddings is not None:
-                        self.create_faiss_index()
-                    
-                    return True
-            return False
+            loaded = load_index(directory, self.model_name)
+            if loaded is None:
+                return False
+            
+            index = loaded["index"]
+            self.embeddings = loaded["vectors"]
+            self.chunks = loaded["chunks"]
+            self.chunk_hashes = loaded["chunk_hashes"]
+            self.chunk_metadata = loaded["metadata"]
+            self.corpus_hash = loaded["header"]["corpus_hash"]
+            self.sparse_index = loaded["sparse"] or BM25Index.build(self.chunks)
+            # Rebuilt from the stored metadata, a single pass over it
+            self.reference_index = build_reference_index(self.chunk_metadata)
+            
+            if (index is not None and index.ntotal == len(self.chunks)
+                    and loaded["header"].get("index_type", "flat") == self.index_type
+                    and loaded["header"].get("vector_quantization", "none") == self.quantization):
+                self.index = index
+                set_search_params(self.index)
+            else:
+                # Index file missing, stale or of another type; rebuild from the stored vectors
+                self.create_faiss_index()
+            
+            return True
         except Exception as e:
             print(f"❌ Error loading embeddings: {e}")
             return False
     
-    def save_embeddings(self, filepath: str):
-        """Save embeddings to file"""
+    def save_embeddings(self, directory: str, manifest: dict = None):
+        """Save embeddings, chunks, FAISS index and an optional source manifest to an index directory"""
         try:
             if self.embeddings is not None:
-                data = {
-                    'embeddings': self.embeddings,
-                    'chunks': self.chunks
-                }
-                
-                with open(filepath, 'wb') as f:
-                    pickle.dump(data, f)
-                
-                print(f"✅ Embeddings saved to {filepath}")
+                header = save_index(directory, self.embeddings, self.chunks, self.index,
+                                    self.model_name, self.chunk_hashes, self.index_type,
+                                    self.chunk_metadata, self.sparse_index, self.quantization, manifest)
+                self.corpus_hash = header["corpus_hash"]
+                # With a quantized index the full-precision matrix is only needed for
+                # re-scoring, so serve it from disk instead of keeping a copy in memory
+                if self.quantization != "none":
+                    self.embeddings = open_vectors(directory)
+                print(f"✅ Embeddings saved to {directory}")
         except Exception as e:
             print(f"❌ Error saving embeddings: {e}")
     
-    def search(self, query: str, k: int = 5):
-        """Search for similar chunks"""
+    def search(self, query: str, k: int = 5, threshold: float = None, expand: bool = False, allowed_ids=None):
+        """Search for similar chunks, optionally only those above a cosine threshold"""
+        return self.search_batch([query], k, threshold, expand, allowed_ids)[0]
+    
+    def search_batch(self, queries: list, k: int = 5, threshold: float = None, expand: bool = False,
+                     allowed_ids=None) -> list:
+        """Search for several queries with one encode and one index search
+        
+        With expand, each hit is widened to its whole article and repeat hits
+        on the same article are dropped. allowed_ids restricts every query to
+        those chunk rows.
+        """
         if self.index is None or self.embeddings is None:
-            return [], []
+            return [([], []) for _ in queries]
         
         try:
-            # Encode query
-            query_embedding = self.model.encode([query])
-            
-            # Search
-            scores, indices = self.index.search(query_embedding, k)
+            # Encode all queries in one forward pass
+            with telemetry.span("query_encode"):
+                query_embeddings = self.encode_queries(queries)
             
-            # Get results
-            results = []
-            result_scores = []
+            # One index search for the whole batch; hybrid search fuses its dense candidates per query
+            with telemetry.span("index_search"):
+                if self.hybrid and self.sparse_index is not None:
+                    dense = self.search_vectors(query_embeddings, max(k, HYBRID_CANDIDATES), threshold, allowed_ids)
+                    results = [self._fuse(query, query_embedding, dense_ids, dense_scores, k, allowed_ids)[:2]
+                               for query, query_embedding, (dense_ids, dense_scores)
+                               in zip(queries, query_embeddings, dense)]
+                else:
+                    results = self.search_vectors(query_embeddings, k, threshold, allowed_ids)
             
-            for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-                if idx < len(self.chunks):
-                    results.append(self.chunks[idx])
-                    result_scores.append(score)
+            with telemetry.span("filtering"):
+                batch_results = []
+                for ids, scores in results:
+                    if expand:
+                        batch_results.append(self.expand_hits(ids, scores))
+                    else:
+                        batch_results.append(([self.chunks[idx] for idx in ids], scores))
             
-            return results, result_scores
+            return batch_results
             
         except Exception as e:
+            telemetry.increment("errors", stage="search")
             print(f"❌ Error in search: {e}")
-            return [], []
+            return [([], []) for _ in queries]
+    
+    def encode_queries(self, queries: list) -> np.ndarray:
+        """Encode queries into normalized vectors"""
+        return normalize_vectors(self.model.encode(queries))
+    
+    def search_vectors(self, query_embeddings: np.ndarray, k: int = 5, threshold: float = None,
+                       allowed_ids=None) -> list:
+        """Search with pre-encoded queries; returns (chunk ids, scores) per query
+        
+        allowed_ids restricts the search to those chunk rows inside FAISS.
+        """
+        params = search_params(self.index, allowed_ids) if allowed_ids is not None else None
+        
+        if self.quantization != "none":
+            # Approximate scores pick the candidates, full-precision vectors rank them
+            _, candidates = self.index.search(query_embeddings, k * RESCORE_FACTOR, params=params)
+            scores, indices = rescore(self.embeddings, query_embeddings, candidates, k)
+            if threshold is not None:
+                indices[scores <= threshold] = -1
+        elif threshold is None:
+            scores, indices = self.index.search(query_embeddings, k, params=params)
+        else:
+            scores, indices = self._range_search(query_embeddings, k, threshold, params)
+        
+        results = []
+        for row_scores, row_indices in zip(scores, indices):
+            valid = [(int(idx), float(score)) for score, idx in zip(row_scores, row_indices)
+                     if 0 <= idx < len(self.chunks)]
+            results.append(([idx for idx, _ in valid], [score for _, score in valid]))
+        
+        return results
+    
+    def resolve_references(self, query: str, allowed_ids=None) -> list:
+        """Chunk ids of Articles/clauses named in the query"""
+        ids = resolve_references(self.reference_index, query)
+        if allowed_ids is not None:
+            allowed = set(allowed_ids)
+            ids = [idx for idx in ids if idx in allowed]
+        return ids
+    
+    def part_ids(self, query: str):
+        """Chunk ids of the Parts named in the query, to restrict a search to; None if it names none"""
+        return resolve_parts(self.reference_index, query)
+    
+    def lookup_references(self, query: str, k: int = 5, expand: bool = False) -> tuple:
+        """Chunks for Articles/clauses named in the query, found without encoding it"""
+        ids = self.resolve_references(query)[:k]
+        scores = [1.0] * len(ids)
+        if expand:
+            return self.expand_hits(ids, scores)
+        return [self.chunks[idx] for idx in ids], scores
+    
+    def hybrid_search(self, query: str, query_embedding: np.ndarray, k: int = 5, threshold: float = None,
+                      allowed_ids=None) -> tuple:
+        """Fuse dense and BM25 rankings by reciprocal rank
+        
+        Returns (chunk ids, cosine scores, fusion scores); the ids are ranked by
+        fusion score, which is what hits from several indexes should be merged on.
+        The threshold only limits the dense candidates, so exact term matches
+        (e.g. "Article 25A") still surface when their embedding score is low.
+        """
+        candidates = max(k, HYBRID_CANDIDATES)
+        dense_ids, dense_scores = self.search_vectors(query_embedding.reshape(1, -1), candidates,
+                                                      threshold, allowed_ids)[0]
+        return self._fuse(query, query_embedding, dense_ids, dense_scores, k, allowed_ids)
+    
+    def _fuse(self, query: str, query_embedding: np.ndarray, dense_ids: list, dense_scores: list, k: int,
+              allowed_ids=None) -> tuple:
+        """Fuse one query's dense candidates with its BM25 hits, as hybrid_search returns them"""
+        sparse_ids, _ = self.sparse_index.search(query, max(k, HYBRID_CANDIDATES), allowed_ids)
+        fused, fusion_scores = reciprocal_rank_fusion([dense_ids, sparse_ids])
+        fused, fusion_scores = fused[:k], fusion_scores[:k]
+        
+        # Report cosine similarity for every hit, computing it for sparse-only ones
+        scores = dict(zip(dense_ids, dense_scores))
+        missing = [idx for idx in fused if idx not in scores]
+        if missing:
+            similarities = np.asarray(self.embeddings[sorted(missing)], dtype=np.float32) @ query_embedding
+            scores.update(zip(sorted(missing), similarities.tolist()))
+        
+        return fused, [float(scores[idx]) for idx in fused], fusion_scores
+    
+    def article_span(self, idx: int) -> tuple:
+        """First and last chunk ids of the article containing chunk idx"""
+        if idx >= len(self.chunk_metadata) or not self.chunk_metadata[idx].get("article"):
+            return idx, idx
+        
+        # An article's chunks are contiguous, so only its neighbours are checked
+        key = (self.chunk_metadata[idx].get("part"), self.chunk_metadata[idx]["article"])
+        same = lambda i: (self.chunk_metadata[i].get("part"), self.chunk_metadata[i].get("article")) == key
+        first, last = idx, idx
+        while first > 0 and same(first - 1):
+            first -= 1
+        while last + 1 < len(self.chunk_metadata) and same(last + 1):
+            last += 1
+        return first, last
+    
+    def expand_to_article(self, idx: int) -> str:
+        """Text of the whole article containing chunk idx"""
+        first, last = self.article_span(idx)
+        return stitch_chunks(self.chunks[first:last + 1], self.chunk_metadata[first:last + 1])
+    
+    def expand_hits(self, ids: list, scores: list) -> tuple:
+        """Widen hits to their articles, keeping the best score per article"""
+        chunks, kept_scores, seen = [], [], set()
+        for idx, score in zip(ids, scores):
+            span = self.article_span(idx)
+            if span in seen:
+                continue
+            seen.add(span)
+            chunks.append(self.expand_to_article(idx))
+            kept_scores.append(score)
+        return chunks, kept_scores
+    
+    def _range_search(self, query_embeddings: np.ndarray, k: int, threshold: float, params=None):
+        """Top-k hits with cosine similarity above threshold, applied inside FAISS"""
+        try:
+            lims, distances, labels = self.index.range_search(query_embeddings, threshold, params=params)
+        except RuntimeError:
+            # Index type without range search support: filter the top k instead
+            scores, indices = self.index.search(query_embeddings, k, params=params)
+            keep = scores > threshold
+            return ([row[mask] for row, mask in zip(scores, keep)],
+                    [row[mask] for row, mask in zip(indices, keep)])
+        
+        scores = []
+        indices = []
+        for i in range(len(query_embeddings)):
+            row_scores = distances[lims[i]:lims[i + 1]]
+            row_labels = labels[lims[i]:lims[i + 1]]
+            
+            # Range search results are unordered
+            order = np.argsort(-row_scores)[:k]
+            scores.append(row_scores[order])
+            indices.append(row_labels[order])
+        
+        return scores, indices
     
     def get_embedding_stats(self) -> dict:
         """Get embedding statistics"""
@@ -131,6 +378,16 @@ class EmbeddingManager:
             "total_chunks": len(self.chunks) if hasattr(self, 'chunks') else 0,
             "embedding_dimension": self.embeddings.shape[1] if self.embeddings is not None else 0,
             "faiss_index_size": self.index.ntotal if self.index is not None else 0,
+            "index_type": self.index_type,
+            "vector_quantization": self.quantization,
             "model_name": self.model_name
         }
-        return stats
\ No newline at end of file
+        return stats
+
+
+def normalize_vectors(vectors) -> np.ndarray:
+    """L2-normalize rows so inner product equals cosine similarity"""
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
@@ -0,0 +1,76 @@
+# extractive_answer.py
+"""Extractive answers built from the retrieved chunks when the LLM is unavailable
+
+Every sentence of the retrieved chunks is scored at once: the share of
+query terms it contains, blended with its embedding similarity to the
+query when an encoder is available. The best few sentences are returned
+in document order under the heading of the chunk they came from.
+"""
+
+import re
+import numpy as np
+from context_packer import SENTENCE_PATTERN, STOPWORDS
+from sparse_index import tokenize
+from config import FALLBACK_MAX_SENTENCES, FALLBACK_EMBEDDING_WEIGHT
+
+TITLE_PATTERN = re.compile(r'(Article\s+\d+[A-Z]?|PART\s+[IVXLCDM]+)')
+
+
+def split_sentences(chunks: list) -> tuple:
+    """Distinct sentences of the chunks with the index of the chunk each came from"""
+    sentences, sources, seen = [], [], set()
+    for chunk_id, chunk in enumerate(chunks):
+        for sentence in SENTENCE_PATTERN.split(chunk):
+            sentence = sentence.strip()
+            key = " ".join(tokenize(sentence))
+            if key and key not in seen:
+                seen.add(key)
+                sentences.append(sentence)
+                sources.append(chunk_id)
+    return sentences, np.asarray(sources, dtype=np.int64)
+
+
+def score_sentences(query: str, sentences: list, embed=None,
+                    embedding_weight: float = FALLBACK_EMBEDDING_WEIGHT) -> np.ndarray:
+    """Blend of query-term coverage and embedding similarity for each sentence"""
+    query_terms = np.array(sorted(set(tokenize(query)) - STOPWORDS))
+    tokens = [tokenize(sentence) for sentence in sentences]
+
+    coverage = np.zeros(len(sentences), dtype=np.float32)
+    if len(query_terms):
+        flat = np.array([token for sentence_tokens in tokens for token in sentence_tokens])
+        owners = np.repeat(np.arange(len(sentences)), [len(sentence_tokens) for sentence_tokens in tokens])
+        hits = np.isin(flat, query_terms) if len(flat) else np.zeros(0, dtype=bool)
+        # Count each query term once per sentence
+        matched = np.unique(np.stack([owners[hits], np.searchsorted(query_terms, flat[hits])]), axis=1)
+        coverage = np.bincount(matched[0], minlength=len(sentences)).astype(np.float32) / len(query_terms)
+
+    vectors = embed([query] + sentences) if embed is not None else None
+    if vectors is None:
+        return coverage
+
+    similarity = np.clip(vectors[1:] @ vectors[0], 0.0, 1.0)
+    return (1.0 - embedding_weight) * coverage + embedding_weight * similarity
+
+
+def extractive_answer(query: str, chunks: list, embed=None, max_sentences: int = FALLBACK_MAX_SENTENCES) -> str:
+    """The sentences that best answer the query, grouped under their chunk titles; "" if none match"""
+    sentences, sources = split_sentences(chunks)
+    if not sentences:
+        return ""
+
+    scores = score_sentences(query, sentences, embed)
+    best = np.argsort(-scores, kind="stable")[:max_sentences]
+    best = np.sort(best[scores[best] > 0])
+    if len(best) == 0:
+        return ""
+
+    sections = []
+    for chunk_id in dict.fromkeys(sources[best].tolist()):
+        title = TITLE_PATTERN.search(chunks[chunk_id])
+        text = " ".join(sentences[i] for i in best if sources[i] == chunk_id)
+        # Skip the title prefix when the first sentence already starts with it
+        if title and not text.startswith(title.group(1)):
+            text = f"{title.group(1)}: {text}"
+        sections.append(text)
+    return "\n\n".join(sections)
@@ -0,0 +1,249 @@
+# index_store.py
+"""Versioned on-disk index store for embeddings, FAISS index and chunks
+
+Layout of an index directory:
+    header.json   - format version, model name, dimension, counts, corpus hash
+    vectors.npy   - embedding matrix (float32 or float16), memory-mapped on load
+    index.faiss   - FAISS index written with faiss.write_index (vectors possibly quantized)
+    chunks.bin    - UTF-8 chunk texts, concatenated
+    offsets.npy   - int64 offset table into chunks.bin (len = chunks + 1)
+    hashes.npy    - per-chunk content hashes (hex SHA-256), row-aligned with vectors
+    metadata.json - per-chunk metadata (document, Part, Article, page)
+    sparse.npz    - BM25 postings over the chunk texts (see sparse_index)
+    manifest.json - source document the index was built from (optional)
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import time
+import numpy as np
+from config import INDEX_FORMAT_VERSION, VECTOR_STORAGE_DTYPE
+from sparse_index import BM25Index
+
+HEADER_FILE = "header.json"
+VECTORS_FILE = "vectors.npy"
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.bin"
+OFFSETS_FILE = "offsets.npy"
+HASHES_FILE = "hashes.npy"
+METADATA_FILE = "metadata.json"
+MANIFEST_FILE = "manifest.json"
+
+
+class ChunkStore:
+    """Read-only sequence of chunk texts backed by a memory-mapped file"""
+
+    def __init__(self, data, offsets):
+        self._data = data
+        self._offsets = offsets
+
+    @classmethod
+    def from_directory(cls, directory: str) -> "ChunkStore":
+        """Open the chunk store of an index directory without reading it"""
+        offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode='r')
+        chunks_path = os.path.join(directory, CHUNKS_FILE)
+
+        if os.path.getsize(chunks_path) == 0:
+            return cls(b"", offsets)
+
+        with open(chunks_path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(data, offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chunk index out of range")
+
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._data[start:end].decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def compute_chunk_hash(chunk: str) -> str:
+    """Content hash identifying a chunk independent of its position"""
+    return hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+
+
+def compute_corpus_hash(chunks) -> str:
+    """Hash the ordered chunk texts so a store can be matched to its corpus"""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        encoded = chunk.encode('utf-8')
+        digest.update(len(encoded).to_bytes(8, 'little'))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def save_index(directory: str, embeddings, chunks, index, model_name: str, chunk_hashes=None,
+               index_type: str = "flat", metadata=None, sparse_index=None, quantization: str = "none",
+               manifest: dict = None) -> dict:
+    """Write an index directory atomically and return its header
+
+    The manifest, if given, is written with the other files, so a reader
+    never sees the new index next to the old source manifest.
+    """
+    import faiss
+
+    if chunk_hashes is None:
+        chunk_hashes = [compute_chunk_hash(chunk) for chunk in chunks]
+
+    embeddings = np.asarray(embeddings)
+    # Per-process name so concurrent writers never delete each other's files
+    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    # Vector matrix
+    np.save(os.path.join(tmp_dir, VECTORS_FILE), embeddings.astype(VECTOR_STORAGE_DTYPE))
+
+    # FAISS index
+    if index is not None:
+        faiss.write_index(index, os.path.join(tmp_dir, INDEX_FILE))
+
+    # Chunk texts with offset table
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    with open(os.path.join(tmp_dir, CHUNKS_FILE), 'wb') as f:
+        for i, chunk in enumerate(chunks):
+            encoded = chunk.encode('utf-8')
+            f.write(encoded)
+            offsets[i + 1] = offsets[i] + len(encoded)
+    np.save(os.path.join(tmp_dir, OFFSETS_FILE), offsets)
+    np.save(os.path.join(tmp_dir, HASHES_FILE), np.array(chunk_hashes, dtype='S64').reshape(-1))
+
+    if metadata is None:
+        metadata = [{} for _ in chunks]
+    with open(os.path.join(tmp_dir, METADATA_FILE), 'w', encoding='utf-8') as f:
+        json.dump(list(metadata), f)
+
+    if sparse_index is not None:
+        sparse_index.save(tmp_dir)
+
+    header = {
+        "format_version": INDEX_FORMAT_VERSION,
+        "model_name": model_name,
+        "dimension": int(embeddings.shape[1]),
+        "num_vectors": int(embeddings.shape[0]),
+        "vector_dtype": VECTOR_STORAGE_DTYPE,
+        "index_type": index_type,
+        "vector_quantization": quantization,
+        "corpus_hash": compute_corpus_hash(chunks),
+        "created_at": time.time()
+    }
+    with open(os.path.join(tmp_dir, HEADER_FILE), 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2)
+
+    if manifest is not None:
+        write_manifest(tmp_dir, manifest)
+
+    # Swap the new directory into place with two renames; the old one is only
+    # deleted once it is out of the way, so a failure never leaves neither
+    old_dir = f"{directory}.old-{os.getpid()}"
+    if os.path.exists(directory):
+        os.replace(directory, old_dir)
+    os.replace(tmp_dir, directory)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+
+    return header
+
+
+def open_vectors(directory: str) -> np.ndarray:
+    """Memory-mapped view of an index directory's full-precision vector matrix"""
+    return np.load(os.path.join(directory, VECTORS_FILE), mmap_mode='r')
+
+
+def read_header(directory: str):
+    """Read the header of an index directory, or None if there is none"""
+    header_path = os.path.join(directory, HEADER_FILE)
+    if not os.path.exists(header_path):
+        return None
+
+    with open(header_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_manifest(directory: str):
+    """Read the source manifest of an index directory, or None if there is none"""
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(directory: str, manifest: dict):
+    """Record the source document an index directory was built from"""
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    tmp_path = f"{manifest_path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def load_index(directory: str, model_name: str = None):
+    """Open an index directory; returns a dict of its parts or None"""
+    header = read_header(directory)
+    if header is None:
+        return None
+
+    if header.get("format_version") != INDEX_FORMAT_VERSION:
+        print(f"⚠️ Index format {header.get('format_version')} is not supported, rebuilding")
+        return None
+
+    if model_name is not None and header.get("model_name") != model_name:
+        print(f"⚠️ Index was built with {header.get('model_name')}, rebuilding")
+        return None
+
+    # Memory-mapped, zero-copy views
+    vectors = open_vectors(directory)
+    chunks = ChunkStore.from_directory(directory)
+    chunk_hashes = [h.decode('ascii') for h in np.load(os.path.join(directory, HASHES_FILE))]
+    with open(os.path.join(directory, METADATA_FILE), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+
+    if (len(chunks) != header["num_vectors"] or len(chunk_hashes) != header["num_vectors"]
+            or len(metadata) != header["num_vectors"]
+            or vectors.shape != (header["num_vectors"], header["dimension"])):
+        print("⚠️ Index files are inconsistent with header, rebuilding")
+        return None
+
+    index = None
+    index_path = os.path.join(directory, INDEX_FILE)
+    if os.path.exists(index_path):
+        import faiss
+        try:
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # Index type without mmap support
+            index = faiss.read_index(index_path)
+
+    # Missing or built with other BM25 parameters: the caller rebuilds it
+    sparse = BM25Index.load(directory)
+    if sparse is not None and sparse.num_docs != header["num_vectors"]:
+        sparse = None
+
+    return {
+        "header": header,
+        "vectors": vectors,
+        "chunks": chunks,
+        "chunk_hashes": chunk_hashes,
+        "metadata": metadata,
+        "index": index,
+        "sparse": sparse
+    }
@@ -9,7 +9,29 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from chat_interface import ChatInterface
-from rag_system import RAGSystem
+from rag_system import RAGSystem, get_shared_rag_system
+from config import SIMILARITY_THRESHOLD, BACKGROUND_WARMUP
+
+@st.cache_resource(show_spinner=False)
+def get_rag_system() -> RAGSystem:
+    """Get the RAG system shared by every session in this process"""
+    rag_system = get_shared_rag_system()
+    # Model and index load in the background while the first page renders
+    if BACKGROUND_WARMUP:
+        rag_system.start_warmup()
+    return rag_system
+
+@st.fragment(run_every=1)
+def render_warmup_progress(rag_system: RAGSystem, was_searchable: bool):
+    """Startup progress, refreshed every second until the system is ready
+    
+    The whole page reruns once keyword search becomes available, so the chat
+    input appears, and again when warm-up (or a reload) ends.
+    """
+    readiness = rag_system.get_readiness()
+    if readiness["error"] or not rag_system.warming_up or readiness["searchable"] != was_searchable:
+        st.rerun()
+    st.progress(readiness["progress"], text=f"⏳ {readiness['label']}...")
 
 def main():
     """Main application"""
@@ -25,33 +47,39 @@ def main():
     st.title("🇵🇰 Constitution of Pakistan Assistant")
     st.markdown("Ask questions about the Constitution and get AI-powered answers with sources.")
     
-    # Initialize RAG system
-    if "rag_system" not in st.session_state:
-        st.session_state.rag_system = RAGSystem()
-        st.session_state.system_initialized = False
+    # Shared RAG system (model, index and chunks are loaded once per process;
+    # only chat history and settings live in the session)
+    rag_system = get_rag_system()
     
     # Sidebar
     with st.sidebar:
         st.header("⚙️ Controls")
         
         # Initialize button
-        if not st.session_state.system_initialized:
+        if rag_system.warming_up:
+            render_warmup_progress(rag_system, rag_system.searchable)
+        elif not rag_system.initialized:
+            if rag_system.warmup_error:
+                st.error(f"❌ {rag_system.warmup_error}")
             if st.button("🚀 Initialize System", type="primary", use_container_width=True):
                 with st.spinner("Setting up system..."):
-                    success = st.session_state.rag_system.initialize_system()
-                    st.session_state.system_initialized = success
-                    if success:
+                    if rag_system.initialize_system():
                         st.rerun()
         else:
             st.success("✅ System Ready!")
+            if rag_system.warmup_error:
+                # A failed reload leaves the previous index serving
+                st.warning(f"⚠️ Reload failed: {rag_system.warmup_error}")
             if st.button("🔄 Reload", use_container_width=True):
-                st.session_state.system_initialized = False
+                # Reloads in the background; the progress fragment takes over on the rerun
+                rag_system.start_warmup(force=True)
                 st.rerun()
         
         # Settings
         st.subheader("🔧 Settings")
         retrieval_k = st.slider("Number of sources", 3, 10, 5)
-        similarity_threshold = st.slider("Similarity threshold", 0.5, 2.0, 1.0, 0.1)
+        similarity_threshold = st.slider("Similarity threshold", 0.0, 1.0, SIMILARITY_THRESHOLD, 0.05,
+                                         help="Minimum cosine similarity of a source to the question")
         
         # Quick questions
         st.subheader("❓ Quick Questions")
@@ -67,10 +95,15 @@ def main():
                 st.session_state.current_question = q
     
     # Main content
-    if st.session_state.system_initialized:
+    if rag_system.searchable:
+        if not rag_system.initialized:
+            st.info("⏳ The embedding model is still loading; answers use keyword search until it is ready.")
+        
         # Chat interface
         chat_interface = ChatInterface()
-        chat_interface.render_chat_interface(st.session_state.rag_system, retrieval_k, similarity_threshold)
+        chat_interface.render_chat_interface(rag_system, retrieval_k, similarity_threshold)
+    elif rag_system.warming_up:
+        st.info("👋 Welcome! The system is starting up; the chat opens as soon as the index is loaded.")
     else:
         # Welcome message
         st.info("👋 Welcome! Click 'Initialize System' to get started.")
@@ -0,0 +1,109 @@
+# query_batcher.py
+"""Micro-batching of concurrent search requests"""
+
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from telemetry import telemetry
+from config import QUERY_BATCH_MAX_SIZE, QUERY_BATCH_MAX_WAIT_MS
+
+
+class QueryBatcher:
+    """Collects searches that arrive within a short window and serves them together
+
+    Callers block in search() as before; a background thread groups pending
+    requests into one encode call and one index search, then hands each
+    caller its own slice of the results. The wait window only applies while
+    the previous batch held more than one query, so a lone caller is never
+    delayed. The batch's encode and search spans are added to every caller's
+    trace.
+    """
+
+    def __init__(self, embedding_manager, max_batch_size: int = QUERY_BATCH_MAX_SIZE,
+                 max_wait_ms: float = QUERY_BATCH_MAX_WAIT_MS):
+        self.embedding_manager = embedding_manager
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._last_batch_size = 0
+        self.batches = 0
+        self.queries = 0
+
+    def search(self, query: str, k: int = 5, threshold: float = None, expand: bool = False):
+        """Search for similar chunks, sharing the model call with concurrent callers"""
+        future = Future()
+        self._ensure_worker()
+        # The caller's context carries its trace over to the batching thread
+        self._queue.put((query, k, (threshold, expand), future, contextvars.copy_context()))
+        return future.result()
+
+    def get_stats(self) -> dict:
+        """Get batching statistics"""
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": round(self.queries / self.batches, 2) if self.batches else 0
+        }
+
+    def _ensure_worker(self):
+        """Start the batching thread on first use"""
+        if self._thread is not None:
+            return
+
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Collect requests until the batch is full or the wait window closes"""
+        while True:
+            batch = [self._queue.get()]
+            wait = self.max_wait if self._last_batch_size > 1 else 0.0
+            deadline = time.monotonic() + wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        # Window closed, still take whatever is already queued
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._last_batch_size = len(batch)
+
+            self._process(batch)
+
+    def _process(self, batch: list):
+        """Run one batched search per threshold and fan the results back out"""
+        try:
+            # FAISS range search takes a single radius, so group by (threshold, expand)
+            groups = {}
+            for request in batch:
+                groups.setdefault(request[2], []).append(request)
+
+            for (threshold, expand), requests in groups.items():
+                # Search once with the largest k and trim per request
+                max_k = max(k for _, k, _, _, _ in requests)
+                with telemetry.collect("query_batch") as collected:
+                    results = self.embedding_manager.search_batch([query for query, _, _, _, _ in requests],
+                                                                  max_k, threshold, expand)
+
+                for (_, k, _, future, context), (chunks, scores) in zip(requests, results):
+                    context.run(telemetry.replay, collected)
+                    future.set_result((chunks[:k], scores[:k]))
+
+            self.batches += 1
+            self.queries += len(batch)
+
+        except Exception as e:
+            for _, _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
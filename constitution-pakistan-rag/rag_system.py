@@ -1,13 +1,32 @@
 # rag_system.py
 """Simple RAG system for Constitution chatbot"""
 
+import asyncio
 import os
-import fitz  # PyMuPDF
-import streamlit as st
+import threading
+import time
+from contextlib import contextmanager
 from document_processor import DocumentProcessor
 from embedding_manager import EmbeddingManager
-from ollama_client import OllamaClient
-from config import EMBEDDINGS_DIR
+from ollama_client import AsyncOllamaClient, OllamaClient
+from query_batcher import QueryBatcher
+from answer_cache import AnswerCache
+from corpus_manager import CorpusManager
+from reranker import Reranker
+from sparse_index import BM25Index
+from telemetry import telemetry
+from index_store import read_manifest, write_manifest
+from config import (INDEX_DIR, QUERY_BATCHING_ENABLED, ANSWER_CACHE_ENABLED, CORPUS_DIR, EXPAND_TO_ARTICLE,
+                    REFERENCE_LOOKUP_ENABLED, REFERENCE_LOOKUP_EXCLUSIVE, RERANK_ENABLED, RERANK_CANDIDATES,
+                    METRICS_PORT, METRICS_HOST)
+
+# Startup stages in the order the progress bar reports them
+STARTUP_STAGES = {
+    "document_processing": "Reading the document",
+    "index_load": "Loading the search index",
+    "model_load": "Loading the embedding model",
+    "health_check": "Checking Ollama"
+}
 
 class RAGSystem:
     def __init__(self):
@@ -15,32 +34,132 @@ class RAGSystem:
         self.doc_processor = DocumentProcessor()
         self.embedding_manager = EmbeddingManager()
         self.ollama_client = OllamaClient()
+        self.ollama_client.embed = self._embed_texts
+        self.async_ollama_client = AsyncOllamaClient(self.ollama_client)
+        self.query_batcher = QueryBatcher(self.embedding_manager) if QUERY_BATCHING_ENABLED else None
+        self.answer_cache = AnswerCache() if ANSWER_CACHE_ENABLED else None
+        self.reranker = Reranker() if RERANK_ENABLED else None
+        if METRICS_PORT:
+            telemetry.start_server(METRICS_PORT, METRICS_HOST)
+        # Multi-document mode replaces the single default document
+        self.corpus_manager = CorpusManager() if CORPUS_DIR else None
         self.initialized = False
+        self.startup_timings = {}
+        self.startup_stage = None
+        self.warmup_thread = None
+        self.warmup_error = None
+        # (BM25 index, chunks) answering queries before the embedding model is ready
+        self._lexical = None
+        # Serializes (re)initialization across the sessions sharing this instance
+        self._lock = threading.RLock()
+        self._warmup_lock = threading.Lock()
+    
+    def start_warmup(self, force: bool = False):
+        """Initialize in a background thread so the app renders (and searches lexically) meanwhile
+        
+        force reloads the document and index of an initialized system.
+        """
+        with self._warmup_lock:
+            if self.warming_up or (self.initialized and not force):
+                return
+            self.warmup_error = None
+            self.warmup_thread = threading.Thread(target=self._warmup, args=(force,), name="rag-warmup",
+                                                  daemon=True)
+            self.warmup_thread.start()
+    
+    def _warmup(self, force: bool = False):
+        """Background initialization, remembering where it failed"""
+        if not self.initialize_system(force):
+            self.warmup_error = f"Initialization failed during {STARTUP_STAGES.get(self.startup_stage, 'startup')}"
+    
+    @property
+    def warming_up(self) -> bool:
+        return self.warmup_thread is not None and self.warmup_thread.is_alive()
+    
+    @property
+    def searchable(self) -> bool:
+        """Whether queries can be answered, by keyword search if the model is still loading"""
+        return self.initialized or self._lexical is not None
+    
+    def get_readiness(self) -> dict:
+        """Current startup stage, its label and the fraction of stages done"""
+        done = sum(stage in self.startup_timings for stage in STARTUP_STAGES)
+        return {
+            "ready": self.initialized,
+            "searchable": self.searchable,
+            "stage": self.startup_stage,
+            "label": STARTUP_STAGES.get(self.startup_stage, "Starting up"),
+            "progress": 1.0 if self.initialized and not self.warming_up else done / len(STARTUP_STAGES),
+            "error": self.warmup_error
+        }
+    
+    def initialize_system(self, force: bool = False) -> bool:
+        """Initialize the RAG system (no-op if already initialized unless forced)"""
+        with self._lock:
+            if self.initialized and not force:
+                return True
+            
+            if not force:
+                return self._initialize(self.doc_processor, self.embedding_manager, self.corpus_manager)
+            
+            # Rebuild document/index state into new managers, keeping the loaded model;
+            # the current ones go on serving searches until the swap
+            model = self.embedding_manager.model
+            corpus_manager = None
+            if self.corpus_manager is not None:
+                corpus_manager = CorpusManager(self.corpus_manager.corpus_dir, self.corpus_manager.shards_dir, model)
+            if not self._initialize(DocumentProcessor(), EmbeddingManager(model), corpus_manager):
+                if corpus_manager is not None:
+                    corpus_manager.close()
+                return False
+            return True
     
-    def initialize_system(self) -> bool:
-        """Initialize the RAG system"""
+    def _initialize(self, doc_processor: DocumentProcessor, embedding_manager: EmbeddingManager,
+                    corpus_manager: CorpusManager = None) -> bool:
+        """Run the initialization steps on the given managers, then swap them in"""
         try:
             print("🔄 Initializing RAG system...")
+            self.startup_timings = {}
             
-            # Process document
-            if not self._process_document():
-                return False
+            if corpus_manager is not None:
+                if not self._initialize_corpus(embedding_manager, corpus_manager):
+                    return False
             
-            # Initialize embedding manager
-            if not self._initialize_embedding_manager():
-                return False
+            # Warm start skips document loading and chunking entirely
+            elif not self._warm_start(doc_processor, embedding_manager):
+                # Process document
+                if not self._process_document(doc_processor):
+                    return False
+                
+                # Initialize embedding manager
+                if not self._initialize_embedding_manager(doc_processor, embedding_manager):
+                    return False
             
             # Test Ollama connection
             print("🔍 Testing Ollama connection...")
-            if self.ollama_client.check_connection():
-                print("✅ Ollama connected!")
-                
-                if self.ollama_client.check_model_availability():
-                    print("✅ DeepSeek Coder model available!")
+            with self._timed("health_check"):
+                # Force a fresh check; later renders use the cached result
+                self.ollama_client.get_health(force=True)
+                if self.ollama_client.check_connection():
+                    print("✅ Ollama connected!")
+                    
+                    if self.ollama_client.check_model_availability():
+                        print("✅ DeepSeek Coder model available!")
+                    else:
+                        print("⚠️ DeepSeek Coder model not found")
                 else:
-                    print("⚠️ DeepSeek Coder model not found")
-            else:
-                print("⚠️ Ollama not connected")
+                    print("⚠️ Ollama not connected")
+            
+            timings = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.startup_timings.items())
+            print(f"⏱️ Startup timings: {timings}")
+            
+            previous = self.corpus_manager
+            self.doc_processor, self.embedding_manager, self.corpus_manager = (doc_processor, embedding_manager,
+                                                                               corpus_manager)
+            if self.query_batcher is not None:
+                self.query_batcher.embedding_manager = embedding_manager
+            if previous is not None and previous is not corpus_manager:
+                previous.close()
             
             print("✅ RAG system initialized!")
             self.initialized = True
@@ -50,87 +169,411 @@ class RAGSystem:
             print(f"❌ System initialization failed: {e}")
             return False
     
-    def _process_document(self) -> bool:
+    @contextmanager
+    def _timed(self, stage: str):
+        """Record the wall time of a startup stage"""
+        self.startup_stage = stage
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_timings[stage] = time.perf_counter() - start
+    
+    def _warm_start(self, doc_processor: DocumentProcessor, embedding_manager: EmbeddingManager) -> bool:
+        """Load the cached index directly if the source document is unchanged"""
+        try:
+            manifest = read_manifest(INDEX_DIR)
+            if manifest is None or not doc_processor.matches_manifest(manifest):
+                return False
+            
+            # Document processing is skipped; chunks come from the index store
+            self.startup_timings["document_processing"] = 0.0
+            
+            # The index loads first so BM25 can answer while the model loads
+            with self._timed("index_load"):
+                loaded = embedding_manager.load_embeddings(INDEX_DIR)
+            
+            if not loaded or embedding_manager.corpus_hash != manifest.get("corpus_hash"):
+                print("⚠️ Cached index does not match manifest, rebuilding")
+                return False
+            self._lexical = (embedding_manager.sparse_index, embedding_manager.chunks)
+            
+            print("🔍 Loading embedding model...")
+            with self._timed("model_load"):
+                embedding_manager.load_model()
+            
+            doc_processor.chunks = embedding_manager.chunks
+            doc_processor.chunk_metadata = embedding_manager.chunk_metadata
+            
+            # Remember a touched-but-identical file so it is not re-hashed next time
+            mtime = os.path.getmtime(doc_processor.resolve_document_path())
+            if manifest.get("mtime") != mtime:
+                manifest["mtime"] = mtime
+                write_manifest(INDEX_DIR, manifest)
+            
+            print("✅ Warm start: document unchanged, loaded index from cache")
+            return True
+        except Exception as e:
+            print(f"⚠️ Warm start failed: {e}")
+            return False
+    
+    def _initialize_corpus(self, embedding_manager: EmbeddingManager, corpus_manager: CorpusManager) -> bool:
+        """Ingest the corpus directory into per-document shards"""
+        try:
+            print(f"📚 Loading corpus from {CORPUS_DIR}...")
+            with self._timed("model_load"):
+                embedding_manager.load_model()
+            
+            # Shards only re-index documents that changed
+            corpus_manager.model = embedding_manager.model
+            with self._timed("index_load"):
+                corpus_manager.ingest()
+            
+            return bool(corpus_manager.shards)
+        except Exception as e:
+            print(f"❌ Corpus initialization failed: {e}")
+            return False
+    
+    def _process_document(self, doc_processor: DocumentProcessor) -> bool:
         """Process the document"""
         try:
             print("📄 Processing document...")
-            text = self.doc_processor.load_document()
-            chunks = self.doc_processor.chunk_document(text)
+            # Pages stream from the extractor into the chunker
+            with self._timed("document_processing"):
+                doc_processor.process_document()
             
-            stats = self.doc_processor.get_chunk_stats()
+            stats = doc_processor.get_chunk_stats()
             print(f"✅ Document processed: {stats['total_chunks']} chunks created")
             
+            # Keyword search works from here; embedding the chunks takes much longer
+            chunks = doc_processor.get_chunks()
+            self._lexical = (BM25Index.build(chunks), chunks)
+            
             return True
         except Exception as e:
             print(f"❌ Document processing failed: {e}")
             return False
     
-    def _initialize_embedding_manager(self) -> bool:
+    def _initialize_embedding_manager(self, doc_processor: DocumentProcessor,
+                                      embedding_manager: EmbeddingManager) -> bool:
         """Initialize embedding manager"""
         try:
             print("🔍 Loading embedding model...")
-            self.embedding_manager.load_model()
+            with self._timed("model_load"):
+                embedding_manager.load_model()
             print("✅ Embedding model loaded!")
             
-            # Try to load existing embeddings
-            embeddings_file = os.path.join(EMBEDDINGS_DIR, "constitution_embeddings.pkl")
+            chunks = doc_processor.get_chunks()
+            if not chunks:
+                print("❌ No chunks available")
+                return False
             
-            if self.embedding_manager.load_embeddings(embeddings_file):
-                print("✅ Embeddings loaded from cache")
-            else:
-                print("🔄 Creating new embeddings...")
-                chunks = self.doc_processor.get_chunks()
+            # The manifest lets the next start skip parsing if the document stays unchanged
+            manifest = doc_processor.build_manifest()
+            
+            # Try to load existing embeddings
+            with self._timed("index_load"):
+                loaded = embedding_manager.load_embeddings(INDEX_DIR)
                 
-                if chunks:
-                    self.embedding_manager.create_embeddings(chunks)
-                    self.embedding_manager.create_faiss_index()
-                    print("✅ New embeddings created!")
+                if loaded and embedding_manager.matches_chunks(chunks, doc_processor.chunk_metadata):
+                    print("✅ Embeddings loaded from cache")
+                    manifest["corpus_hash"] = embedding_manager.corpus_hash
+                    write_manifest(INDEX_DIR, manifest)
                 else:
-                    print("❌ No chunks available")
-                    return False
+                    # Only new or changed chunks are re-encoded
+                    print("🔄 Updating embeddings..." if loaded else "🔄 Creating new embeddings...")
+                    embedding_manager.update_embeddings(chunks, doc_processor.chunk_metadata)
+                    manifest["corpus_hash"] = embedding_manager.corpus_hash
+                    embedding_manager.save_embeddings(INDEX_DIR, manifest)
+                    print("✅ Embeddings ready!")
             
             return True
         except Exception as e:
             print(f"❌ Embedding manager initialization failed: {e}")
             return False
     
-    def answer_question(self, query: str) -> tuple:
-        """Answer a question using RAG"""
-        try:
-            if not self.initialized:
-                return "System not initialized", [], []
+    @property
+    def corpus_version(self) -> str:
+        """Hash identifying the indexed corpus, changes whenever it is rebuilt"""
+        if self.corpus_manager is not None:
+            return self.corpus_manager.corpus_hash
+        return self.embedding_manager.corpus_hash
+    
+    def search(self, query: str, k: int = 5, threshold: float = None, filters: dict = None,
+               expand: bool = EXPAND_TO_ARTICLE):
+        """Search for relevant chunks, batching with concurrent searches when enabled
+        
+        filters (document, part, article) apply in multi-document corpus mode.
+        expand widens each hit to the whole article it belongs to. With
+        re-ranking on, more candidates are fetched and a cross-encoder picks k.
+        Named Articles and clauses are looked up directly; a named Part only
+        restricts the search to its chunks. Until initialization finishes,
+        results come from BM25 alone.
+        """
+        if not self.initialized:
+            return self.lexical_search(query, k)
+        
+        direct_chunks, direct_scores = [], []
+        if REFERENCE_LOOKUP_ENABLED:
+            with telemetry.span("reference_lookup"):
+                direct_chunks, direct_scores = self.lookup_references(query, k, filters, expand)
+            # Named references answer the query on their own, no encoding needed
+            if direct_chunks and (REFERENCE_LOOKUP_EXCLUSIVE or len(direct_chunks) >= k):
+                return direct_chunks, direct_scores
+        
+        # A named Part narrows the search to its chunks instead of answering it
+        allowed_ids = None
+        if REFERENCE_LOOKUP_ENABLED:
+            if self.corpus_manager is not None:
+                parts = self.corpus_manager.named_parts(query)
+                if parts and not (filters or {}).get("part"):
+                    filters = dict(filters or {}, part=parts)
+            else:
+                allowed_ids = self.embedding_manager.part_ids(query)
+        
+        fetch = max(k, RERANK_CANDIDATES) if self.reranker is not None else k
+        with telemetry.span("retrieval"):
+            if self.corpus_manager is not None:
+                chunks, scores, _ = self.corpus_manager.search(query, fetch, threshold, filters, expand)
+            elif self.query_batcher is not None and allowed_ids is None:
+                chunks, scores = self.query_batcher.search(query, fetch, threshold, expand)
+            else:
+                chunks, scores = self.embedding_manager.search(query, fetch, threshold, expand, allowed_ids)
+        
+        if self.reranker is not None and chunks:
+            with telemetry.span("rerank"):
+                chunks, scores = self.reranker.rerank(query, chunks, k)
+        
+        # Direct hits go first, followed by semantic hits not already included
+        for chunk, score in zip(chunks, scores):
+            if len(direct_chunks) < k and chunk not in direct_chunks:
+                direct_chunks.append(chunk)
+                direct_scores.append(score)
+        return direct_chunks, direct_scores
+    
+    def lexical_search(self, query: str, k: int = 5) -> tuple:
+        """BM25 hits from the chunks loaded so far, used while the embedding model warms up"""
+        if self._lexical is None:
+            return [], []
+        
+        index, chunks = self._lexical
+        with telemetry.span("lexical_search"):
+            ids, scores = index.search(query, k)
+        telemetry.increment("lexical_searches")
+        return [chunks[i] for i in ids], scores
+    
+    def lookup_references(self, query: str, k: int = 5, filters: dict = None, expand: bool = False) -> tuple:
+        """Chunks for Articles, clauses or Parts the query names (e.g. Article 184(3))"""
+        if self.corpus_manager is not None:
+            chunks, scores, _ = self.corpus_manager.lookup_references(query, k, filters, expand)
+            return chunks, scores
+        return self.embedding_manager.lookup_references(query, k, expand)
+    
+    def get_cached_answer(self, query: str, params: tuple):
+        """Look up (answer, chunks, scores) for a query and retrieval parameters"""
+        if self.answer_cache is None:
+            return None
+        
+        cached = self.answer_cache.get(query, params, self.corpus_version, self._cache_embedding(query))
+        telemetry.increment("cache_hits" if cached is not None else "cache_misses")
+        return cached
+    
+    def cache_answer(self, query: str, params: tuple, answer: str, chunks: list, scores: list):
+        """Remember an answer for a query and retrieval parameters"""
+        # Answers from keyword-only retrieval during warm-up are not kept
+        if self.answer_cache is None or not self.initialized:
+            return
+        
+        self.answer_cache.put(query, params, self.corpus_version,
+                              (answer, list(chunks), list(scores)), self._cache_embedding(query))
+    
+    def _cache_embedding(self, query: str):
+        """Query embedding for the semantic cache tier, if it is enabled"""
+        if not self.answer_cache.semantic_enabled or self.embedding_manager.model is None:
+            return None
+        return self.embedding_manager.model.encode([query])[0]
+    
+    def _embed_texts(self, texts: list):
+        """Normalized embeddings for the extractive fallback, None until the model is loaded"""
+        if self.embedding_manager.model is None:
+            return None
+        return self.embedding_manager.encode_queries(texts)
+    
+    def answer_question(self, query: str, k: int = 5, stats: dict = None) -> tuple:
+        """Answer a question using RAG
+        
+        If a stats dict is given it records the generation mode and time.
+        """
+        if stats is None:
+            stats = {}
+        with telemetry.trace("answer", query=query, k=k):
+            try:
+                if not self.searchable:
+                    return "System not initialized", [], []
             
-            # Get relevant chunks
-            relevant_chunks, scores = self.embedding_manager.search(query, k=5)
+                cached = self.get_cached_answer(query, (k,))
+                if cached is not None:
+                    stats["mode"] = "cache"
+                    telemetry.annotate(mode="cache")
+                    return cached
             
-            if not relevant_chunks:
-                return "No relevant information found", [], []
+                # Get relevant chunks
+                relevant_chunks, scores = self.search(query, k=k)
             
-            # Generate response
-            answer = self.ollama_client.generate_rag_response(query, relevant_chunks)
+                if not relevant_chunks:
+                    return "No relevant information found", [], []
             
-            if not answer:
-                return "Failed to generate response", [], []
+                # Generate response
+                answer = self.ollama_client.generate_rag_response(query, relevant_chunks, stats)
+                telemetry.annotate(mode=stats.get("mode"), chunks=len(relevant_chunks))
             
-            return answer, relevant_chunks, scores
+                if not answer:
+                    return "Failed to generate response", [], []
             
-        except Exception as e:
-            print(f"❌ Error answering question: {e}")
-            return f"An error occurred: {str(e)}", [], []
+                # Fallback answers are not cached, so the next ask can reach the LLM again
+                if stats.get("mode") != "fallback":
+                    self.cache_answer(query, (k,), answer, relevant_chunks, scores)
+                return answer, relevant_chunks, scores
+            
+            except Exception as e:
+                telemetry.increment("errors", stage="answer")
+                print(f"❌ Error answering question: {e}")
+                return f"An error occurred: {str(e)}", [], []
+    
+    async def answer_question_async(self, query: str, k: int = 5) -> tuple:
+        """Answer a question using RAG without blocking the event loop
+        
+        Identical questions already in flight on this loop share one generation.
+        """
+        if not self.searchable:
+            return "System not initialized", [], []
+        
+        cached = await asyncio.to_thread(self.get_cached_answer, query, (k,))
+        if cached is not None:
+            return cached
+        
+        key = (" ".join(query.lower().split()), k)
+        inflight = self.async_ollama_client.inflight()
+        
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._answer_question_async(query, k))
+            inflight[key] = task
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        
+        # Shield so one caller cancelling doesn't cancel the shared answer
+        return await asyncio.shield(task)
+    
+    async def _answer_question_async(self, query: str, k: int) -> tuple:
+        """Run retrieval in a worker thread and generation on the event loop"""
+        with telemetry.trace("answer_async", query=query, k=k):
+            try:
+                relevant_chunks, scores = await asyncio.to_thread(self.search, query, k)
+            
+                if not relevant_chunks:
+                    return "No relevant information found", [], []
+            
+                stats = {}
+                answer = await self.async_ollama_client.generate_rag_response(query, relevant_chunks, stats)
+                telemetry.annotate(mode=stats.get("mode"), chunks=len(relevant_chunks))
+            
+                if not answer:
+                    return "Failed to generate response", [], []
+            
+                if stats.get("mode") != "fallback":
+                    self.cache_answer(query, (k,), answer, relevant_chunks, scores)
+                return answer, relevant_chunks, scores
+            
+            except Exception as e:
+                telemetry.increment("errors", stage="answer")
+                print(f"❌ Error answering question: {e}")
+                return f"An error occurred: {str(e)}", [], []
     
     def display_system_status(self):
         """Display system status"""
+        import streamlit as st
+        
         if self.initialized:
             st.success("✅ RAG System Ready")
             
             # Show basic stats
             col1, col2 = st.columns(2)
-            with col1:
-                doc_stats = self.doc_processor.get_chunk_stats()
-                st.metric("Document Chunks", doc_stats.get('total_chunks', 0))
+            if self.corpus_manager is not None:
+                corpus_stats = self.corpus_manager.get_corpus_stats()
+                with col1:
+                    st.metric("Documents", corpus_stats['documents'])
+                with col2:
+                    st.metric("Document Chunks", corpus_stats['total_chunks'])
+            else:
+                with col1:
+                    doc_stats = self.doc_processor.get_chunk_stats()
+                    st.metric("Document Chunks", doc_stats.get('total_chunks', 0))
+                
+                with col2:
+                    emb_stats = self.embedding_manager.get_embedding_stats()
+                    st.metric("Embeddings", emb_stats.get('faiss_index_size', 0))
+            
+            st.metric("Process Memory (MB)", get_process_memory_mb())
+            
+            if self.answer_cache is not None:
+                cache_stats = self.answer_cache.get_stats()
+                st.caption(f"🗃️ Answer cache: {cache_stats['exact_hits'] + cache_stats['semantic_hits']} hits, "
+                           f"{cache_stats['misses']} misses ({cache_stats['size']} entries)")
             
-            with col2:
-                emb_stats = self.embedding_manager.get_embedding_stats()
-                st.metric("Embeddings", emb_stats.get('faiss_index_size', 0))
+            if self.reranker is not None:
+                rerank_stats = self.reranker.get_stats()
+                st.caption(f"🎯 Re-ranker: {rerank_stats['calls']} calls, "
+                           f"{rerank_stats['avg_candidates']:.0f} candidates avg, "
+                           f"p50 {rerank_stats['p50_ms']:.0f} ms / p95 {rerank_stats['p95_ms']:.0f} ms")
+            
+            telemetry_stats = telemetry.get_stats()
+            if telemetry_stats["stages"]:
+                with st.expander("📈 Request latency"):
+                    for stage, latency in telemetry_stats["stages"].items():
+                        st.text(f"{stage}: p50 {latency['p50_ms']:.1f} ms · p95 {latency['p95_ms']:.1f} ms "
+                                f"({latency['count']})")
+                    for name, count in telemetry_stats["counters"].items():
+                        st.text(f"{name}: {count}")
+            
+            if self.startup_timings:
+                with st.expander("⏱️ Startup timings"):
+                    for stage, seconds in self.startup_timings.items():
+                        st.text(f"{stage}: {seconds:.3f}s")
         else:
-            st.warning("⚠️ System not initialized")
\ No newline at end of file
+            st.warning("⚠️ System not initialized")
+
+
+_shared_rag_system = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_rag_system() -> RAGSystem:
+    """Get the process-wide RAG system, creating it on first use"""
+    global _shared_rag_system
+    
+    with _shared_lock:
+        if _shared_rag_system is None:
+            _shared_rag_system = RAGSystem()
+        return _shared_rag_system
+
+
+def get_process_memory_mb() -> float:
+    """Get the resident memory of the current process in MB"""
+    try:
+        # Current RSS on Linux
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    
+    try:
+        # Peak RSS elsewhere (KB on Linux, bytes on macOS)
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return round(peak / divisor, 1)
+    except (ImportError, OSError):
+        return 0.0
\ No newline at end of file
@@ -0,0 +1,68 @@
+# reference_index.py
+"""Direct lookup of Article, clause and Part references
+
+Chunk metadata already names each chunk's Part, Article and clause, so a
+dict from those labels to chunk ids answers "What does Article 184(3)
+say?" without encoding the query at all. A Part is too broad to answer a
+question by itself, so Part references only narrow the semantic search.
+"""
+
+import re
+
+REFERENCE_PATTERN = re.compile(
+    r'\b(?:articles?|art\.?)\s*(?P<article>\d+[A-Z]?)\b(?:\s*\(\s*(?P<clause>\d+[A-Z]?)\s*\))?'
+    r'|\bpart\s+(?P<part>(?-i:[IVXLCDM]+))\b',
+    re.IGNORECASE
+)
+
+
+def build_reference_index(metadata: list) -> dict:
+    """Map "Article 25A", "Article 184(3)" and "PART II" labels to chunk ids"""
+    index = {}
+    for idx, meta in enumerate(metadata):
+        for field in ("part", "article", "clause"):
+            label = meta.get(field)
+            if label:
+                index.setdefault(label, []).append(idx)
+    return index
+
+
+def find_references(query: str) -> list:
+    """Article and clause labels referenced by a query, each with fallbacks from most to least specific"""
+    references = []
+    for match in REFERENCE_PATTERN.finditer(query):
+        if match.group("part"):
+            continue
+
+        article = f"Article {match.group('article').upper()}"
+        if match.group("clause"):
+            # A clause short enough to share its article's chunk has no label of its own
+            references.append([f"{article}({match.group('clause').upper()})", article])
+        else:
+            references.append([article])
+    return references
+
+
+def find_parts(query: str) -> list:
+    """Part labels referenced by a query, e.g. ["PART II"]"""
+    return [f"PART {match.group('part')}" for match in REFERENCE_PATTERN.finditer(query) if match.group("part")]
+
+
+def resolve_parts(index: dict, query: str):
+    """Sorted chunk ids of the Parts named in the query, or None if it names none in the index"""
+    labels = [label for label in find_parts(query) if label in index]
+    if not labels:
+        return None
+    return sorted(set().union(*(index[label] for label in labels)))
+
+
+def resolve_references(index: dict, query: str) -> list:
+    """Chunk ids for every reference in the query, in the order they are mentioned"""
+    ids, seen = [], set()
+    for labels in find_references(query):
+        for label in labels:
+            if label in index:
+                ids.extend(idx for idx in index[label] if idx not in seen)
+                seen.update(index[label])
+                break
+    return ids
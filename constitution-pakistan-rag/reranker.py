@@ -0,0 +1,109 @@
+# reranker.py
+"""Cross-encoder re-ranking of retrieved chunks under a token budget"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+import numpy as np
+from answer_cache import normalize_query
+from index_store import compute_chunk_hash
+from config import RERANKER_MODEL, RERANK_BATCH_SIZE, RERANK_TOKEN_BUDGET, RERANK_CACHE_SIZE
+
+
+class Reranker:
+    """Scores (query, chunk) pairs with a small CPU cross-encoder
+
+    The model is loaded on first use. Scores are cached per normalized
+    query and chunk hash, so repeat questions only pay for new chunks.
+    Latencies of recent calls are kept to tune the candidate count.
+    """
+
+    def __init__(self, model_name: str = RERANKER_MODEL, batch_size: int = RERANK_BATCH_SIZE,
+                 cache_size: int = RERANK_CACHE_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.model = None
+
+        self._cache = OrderedDict()  # (query, chunk hash) -> score
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=512)  # (candidates, scored, ms) per call
+
+        self.calls = 0
+        self.cache_hits = 0
+        self.scored = 0
+
+    def load_model(self):
+        """Load the cross-encoder"""
+        with self._lock:
+            if self.model is None:
+                from sentence_transformers import CrossEncoder
+                self.model = CrossEncoder(self.model_name, device="cpu")
+
+    def rerank(self, query: str, chunks: list, k: int = 5, token_budget: int = RERANK_TOKEN_BUDGET) -> tuple:
+        """Best k chunks by cross-encoder score that fit the token budget; returns (chunks, scores)"""
+        if not chunks:
+            return [], []
+
+        start = time.perf_counter()
+        normalized = normalize_query(query)
+        keys = [(normalized, compute_chunk_hash(chunk)) for chunk in chunks]
+
+        scores = np.empty(len(chunks), dtype=np.float32)
+        with self._lock:
+            missing = []
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+                else:
+                    missing.append(i)
+
+        if missing:
+            self.load_model()
+            predicted = self.model.predict([(query, chunks[i]) for i in missing],
+                                           batch_size=self.batch_size, show_progress_bar=False)
+            scores[missing] = np.asarray(predicted, dtype=np.float32).reshape(-1)
+
+            with self._lock:
+                for i in missing:
+                    self._cache[keys[i]] = float(scores[i])
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        # Greedily keep the best chunks while they fit; the top chunk always does
+        kept_chunks, kept_scores, used = [], [], 0
+        for i in np.argsort(-scores, kind="stable"):
+            if len(kept_chunks) == k:
+                break
+            tokens = len(chunks[i].split())
+            if kept_chunks and used + tokens > token_budget:
+                continue
+            kept_chunks.append(chunks[i])
+            kept_scores.append(float(scores[i]))
+            used += tokens
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.calls += 1
+            self.cache_hits += len(chunks) - len(missing)
+            self.scored += len(missing)
+            self._latencies.append((len(chunks), len(missing), elapsed_ms))
+
+        return kept_chunks, kept_scores
+
+    def get_stats(self) -> dict:
+        """Call counts, cache hits and latency percentiles of recent calls"""
+        with self._lock:
+            latencies = [ms for _, _, ms in self._latencies]
+            candidates = [count for count, _, _ in self._latencies]
+
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "scored": self.scored,
+            "avg_candidates": float(np.mean(candidates)) if candidates else 0.0,
+            "p50_ms": float(np.percentile(latencies, 50)) if latencies else 0.0,
+            "p95_ms": float(np.percentile(latencies, 95)) if latencies else 0.0,
+            "last_ms": latencies[-1] if latencies else 0.0
+        }
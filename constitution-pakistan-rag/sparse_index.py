@@ -0,0 +1,123 @@
+# sparse_index.py
+"""BM25 inverted index over chunk texts, and reciprocal-rank fusion
+
+Postings are stored as flat numpy arrays (per-term offsets into parallel
+doc id / weight arrays) with the BM25 term weight precomputed for every
+posting, so a query costs one vectorized add per query term.
+"""
+
+import os
+import re
+import numpy as np
+from config import BM25_K1, BM25_B, RRF_K
+
+SPARSE_FILE = "sparse.npz"
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: str) -> list:
+    """Lowercase alphanumeric tokens; "Article 25A" becomes ["article", "25a"]"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(self, terms: list, offsets: np.ndarray, doc_ids: np.ndarray, weights: np.ndarray,
+                 num_docs: int, k1: float = BM25_K1, b: float = BM25_B):
+        """Wrap prebuilt postings; use build() or load() to create one"""
+        self.terms = list(terms)
+        self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.num_docs = num_docs
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def build(cls, chunks, k1: float = BM25_K1, b: float = BM25_B) -> "BM25Index":
+        """Tokenize chunks once and precompute every posting's BM25 weight"""
+        vocabulary = {}
+        token_ids = []
+        doc_lengths = np.zeros(len(chunks), dtype=np.int64)
+        for doc, chunk in enumerate(chunks):
+            ids = [vocabulary.setdefault(token, len(vocabulary)) for token in tokenize(chunk)]
+            token_ids.extend(ids)
+            doc_lengths[doc] = len(ids)
+
+        num_docs = len(chunks)
+        token_ids = np.asarray(token_ids, dtype=np.int64)
+        docs = np.repeat(np.arange(num_docs, dtype=np.int64), doc_lengths)
+
+        # One posting per (term, doc) pair, sorted by term then doc
+        keys, term_freqs = np.unique(token_ids * max(num_docs, 1) + docs, return_counts=True)
+        posting_terms = keys // max(num_docs, 1)
+        posting_docs = keys % max(num_docs, 1)
+
+        doc_freqs = np.bincount(posting_terms, minlength=len(vocabulary))
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(doc_freqs, out=offsets[1:])
+
+        # Okapi idf, clamped at zero: terms in over half the chunks ("article", "shall")
+        # carry no signal and would only add arbitrary ties to the fused ranking
+        idf = np.maximum(np.log((num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)), 0.0)
+        average_length = doc_lengths.mean() if num_docs else 1.0
+        length_norm = 1.0 - b + b * doc_lengths[posting_docs] / max(average_length, 1e-9)
+        weights = idf[posting_terms] * term_freqs * (k1 + 1) / (term_freqs + k1 * length_norm)
+
+        terms = sorted(vocabulary, key=vocabulary.get)
+        return cls(terms, offsets, posting_docs.astype(np.int32), weights.astype(np.float32), num_docs, k1, b)
+
+    @classmethod
+    def load(cls, directory: str):
+        """Load a saved index, or None if missing or built with other BM25 parameters"""
+        path = os.path.join(directory, SPARSE_FILE)
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as data:
+            k1, b = (float(value) for value in data["params"])
+            if (k1, b) != (BM25_K1, BM25_B):
+                return None
+            return cls(data["terms"].tolist(), data["offsets"], data["doc_ids"], data["weights"],
+                       int(data["num_docs"]), k1, b)
+
+    def save(self, directory: str):
+        """Write the postings next to the dense index files"""
+        np.savez(os.path.join(directory, SPARSE_FILE),
+                 terms=np.array(self.terms, dtype=str), offsets=self.offsets,
+                 doc_ids=self.doc_ids, weights=self.weights,
+                 num_docs=np.int64(self.num_docs), params=np.array([self.k1, self.b]))
+
+    def search(self, query: str, k: int = 5, allowed_ids=None) -> tuple:
+        """Top-k (doc ids, BM25 scores) for a query"""
+        term_ids = {self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}
+        if not term_ids or self.num_docs == 0:
+            return [], []
+
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # Doc ids are unique within a posting list, so fancy-index add is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+
+        if allowed_ids is not None:
+            mask = np.zeros(self.num_docs, dtype=bool)
+            mask[np.asarray(allowed_ids, dtype=np.int64)] = True
+            scores[~mask] = 0.0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return candidates.tolist(), scores[candidates].tolist()
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = RRF_K) -> tuple:
+    """Merge ranked id lists; each id scores sum(1 / (k + rank)). Returns (ids, fusion scores)"""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    ids = sorted(fused, key=fused.get, reverse=True)
+    return ids, [fused[doc_id] for doc_id in ids]
@@ -0,0 +1,245 @@
+# structural_chunker.py
+"""Single-pass structural chunker for Part/Chapter/Article/clause documents
+
+Headings are found with one compiled pattern in a single left-to-right
+scan. Each chunk is described by a compact record of offsets into the
+source text plus the ids of its enclosing Part, Chapter, Article and
+clause, so a hit can be widened to its whole article without re-reading
+the document. Long articles are split on a token budget with overlap,
+preferring clause boundaries.
+"""
+
+import re
+import bisect
+import numpy as np
+from config import CHUNK_MIN_LENGTH, CHUNK_TOKEN_BUDGET, CHUNK_TOKEN_OVERLAP
+
+# Headings start a line; the leading newline lets the regex engine skip ahead between lines
+STRUCTURE_PATTERN = re.compile(
+    r'\n[ \t]*(?:'
+    r'(?P<part>PART[ \t]+[IVXLCDM]+)\b'
+    r'|(?P<chapter>CHAPTER[ \t]+\d+[A-Z]?)\b'
+    r'|(?P<article>Article[ \t]+\d+[A-Z]?)\b'
+    r')'
+)
+# Numbered clauses, only looked for inside articles too long for one chunk
+CLAUSE_PATTERN = re.compile(r'\n[ \t]*(\(\d+[A-Z]?\))')
+
+# Longest stretch a heading can span, re-scanned when more text arrives
+HEADING_LOOKBACK = 64
+
+RECORD_DTYPE = np.dtype([
+    ("start", np.int64), ("end", np.int64),
+    ("part", np.int32), ("chapter", np.int32), ("article", np.int32), ("clause", np.int32),
+    ("page", np.int32), ("end_page", np.int32)
+])
+
+PARENT_FIELDS = ("part", "chapter", "article", "clause")
+
+
+class StructuralChunker:
+    """Incremental chunker: feed text page by page, collect chunks as sections close"""
+
+    def __init__(self, token_budget: int = CHUNK_TOKEN_BUDGET, overlap: int = CHUNK_TOKEN_OVERLAP,
+                 min_length: int = CHUNK_MIN_LENGTH):
+        if not 0 <= overlap < token_budget:
+            raise ValueError("Chunk overlap must be smaller than the token budget")
+
+        self.token_budget = token_budget
+        self.overlap = overlap
+        self.min_length = min_length
+        self.labels = []  # section id -> label, e.g. "PART II" or "Article 25A(1)"
+        self._records = []
+
+        # A virtual newline before the source lets a heading on its first line match
+        self._buffer = "\n"
+        self._base = -1  # source offset of the first buffered character
+        self._scan_pos = self._base  # source offset the next scan starts from, at the virtual newline
+        self._page_offsets, self._page_numbers = [], []
+        self._parents = {field: -1 for field in ("part", "chapter", "article")}
+        self._section = {"kind": "preamble", "start": 0, "body": 0}
+
+        # Windows advance budget - overlap tokens and extend overlap tokens past that
+        self._step_pattern = re.compile(r'(?:\S+\s*){1,%d}' % (token_budget - overlap))
+        self._overlap_pattern = re.compile(r'(?:\S+\s*){0,%d}' % overlap)
+
+    @property
+    def records(self) -> np.ndarray:
+        """Chunk records as a structured array of RECORD_DTYPE"""
+        return np.array(self._records, dtype=RECORD_DTYPE)
+
+    def feed(self, text: str, page: int = None) -> list:
+        """Add the next piece of the source text; returns chunks of sections it closed"""
+        if page is None:
+            page = self._page_numbers[-1] + 1 if self._page_numbers else 1
+        self._page_offsets.append(self._base + len(self._buffer))
+        self._page_numbers.append(page)
+        self._buffer += text
+
+        chunks = self._scan(final=False)
+        self._trim()
+        return chunks
+
+    def finish(self) -> list:
+        """Close the last section once the whole source has been fed"""
+        chunks = self._scan(final=True)
+        chunks.extend(self._close_section(self._base + len(self._buffer)))
+        return chunks
+
+    def metadata(self, record) -> dict:
+        """Plain metadata dict for one chunk record"""
+        metadata = {field: self.labels[record[field]] if record[field] >= 0 else None
+                    for field in PARENT_FIELDS}
+        metadata.update(page=int(record["page"]), end_page=int(record["end_page"]),
+                        start=int(record["start"]), end=int(record["end"]))
+        return metadata
+
+    def _scan(self, final: bool) -> list:
+        """Consume headings found since the last scan"""
+        chunks = []
+        end_of_buffer = len(self._buffer)
+
+        for match in STRUCTURE_PATTERN.finditer(self._buffer, self._scan_pos - self._base):
+            # A heading touching the end of the buffer may still grow ("Article 2" -> "Article 25A")
+            if not final and match.end() == end_of_buffer:
+                break
+
+            kind = match.lastgroup
+            start = self._base + match.start(kind)
+            self._scan_pos = self._base + match.end()
+
+            chunks.extend(self._close_section(start))
+
+            label = " ".join(match.group(kind).split())
+            self._parents[kind] = self._add_label(label)
+            # A new Part resets its Chapter, and any new heading leaves the previous Article
+            if kind == "part":
+                self._parents["chapter"] = -1
+            self._parents["article"] = self._parents[kind] if kind == "article" else -1
+            self._section = {"kind": kind, "start": start, "body": self._base + match.end()}
+
+        if not final:
+            self._scan_pos = max(self._scan_pos, self._base + end_of_buffer - HEADING_LOOKBACK)
+        return chunks
+
+    def _trim(self):
+        """Drop buffered text that no open section or pending heading needs"""
+        cut = min(self._section["start"], self._scan_pos) - self._base
+        if cut <= 0:
+            return
+
+        self._buffer = self._buffer[cut:]
+        self._base += cut
+        first = max(0, bisect.bisect_right(self._page_offsets, self._base) - 1)
+        self._page_offsets = self._page_offsets[first:]
+        self._page_numbers = self._page_numbers[first:]
+
+    def _close_section(self, end: int) -> list:
+        """Turn the open section [start, end) into chunk records"""
+        section = self._section
+        start, end = self._strip(section["start"], end)
+        body_start, _ = self._strip(section["body"], end)
+
+        # Articles always count; title blocks and preambles must carry real text
+        if body_start >= end:
+            return []
+        if section["kind"] != "article" and end - start <= self.min_length:
+            return []
+
+        chunks = []
+        local_end = end - self._base
+        position = start - self._base
+
+        # Most sections fit the budget and become a single chunk; separators bound the
+        # token count without splitting the text
+        separators = sum(self._buffer.count(char, position, local_end) for char in " \n\t")
+        if separators < self.token_budget:
+            return [self._add_record(start, end, section)]
+
+        clauses = []
+        if section["kind"] == "article":
+            clauses = [(match.start(1) + self._base, match.group(1))
+                       for match in CLAUSE_PATTERN.finditer(self._buffer, position, local_end)]
+        clause_offsets = [offset for offset, _ in clauses]
+        clause_ids = {}
+        while True:
+            # The next window starts budget - overlap tokens on; this one runs overlap tokens further
+            step = self._step_pattern.match(self._buffer, position, local_end)
+            window = self._overlap_pattern.match(self._buffer, step.end(), local_end)
+            window_end = end if window.end() >= local_end else self._rstrip(window.end() + self._base)
+            next_position = step.end()
+
+            if window.end() < local_end:
+                # Prefer ending the window where a clause begins, and start the next one there
+                boundary = bisect.bisect_right(clause_offsets, window_end) - 1
+                if boundary >= 0 and clause_offsets[boundary] - self._base > (position + window.end()) // 2:
+                    window_end = self._rstrip(clause_offsets[boundary])
+                    next_position = clause_offsets[boundary] - self._base
+
+            # The clause a window starts in, labelled once per clause
+            clause = bisect.bisect_right(clause_offsets, position + self._base) - 1
+            if clause >= 0 and clause not in clause_ids:
+                clause_ids[clause] = self._add_label(self.labels[self._parents["article"]] + clauses[clause][1])
+
+            chunks.append(self._add_record(position + self._base, window_end, section, clause_ids.get(clause, -1)))
+            if window.end() >= local_end:
+                break
+            position = next_position
+
+        return chunks
+
+    def _add_record(self, start: int, end: int, section: dict, clause: int = -1) -> str:
+        """Store one chunk record and return its text"""
+        self._records.append((start, end, self._parents["part"], self._parents["chapter"],
+                              self._parents["article"], clause, self._page_at(start), self._page_at(end - 1)))
+
+        text = self._buffer[start - self._base:end - self._base]
+        # Continuation windows repeat their heading so they embed in context
+        if start != section["start"] and section["kind"] != "preamble":
+            text = f"{self.labels[self._parents[section['kind']]]}\n{text}"
+        return text
+
+    def _add_label(self, label: str) -> int:
+        self.labels.append(label)
+        return len(self.labels) - 1
+
+    def _strip(self, start: int, end: int) -> tuple:
+        """Narrow [start, end) past surrounding whitespace"""
+        local_start, local_end = start - self._base, end - self._base
+        while local_start < local_end and self._buffer[local_start].isspace():
+            local_start += 1
+        while local_end > local_start and self._buffer[local_end - 1].isspace():
+            local_end -= 1
+        return local_start + self._base, local_end + self._base
+
+    def _rstrip(self, end: int) -> int:
+        """Move end back past trailing whitespace"""
+        local_end = end - self._base
+        while self._buffer[local_end - 1].isspace():
+            local_end -= 1
+        return local_end + self._base
+
+    def _page_at(self, position: int) -> int:
+        return self._page_numbers[max(0, bisect.bisect_right(self._page_offsets, position) - 1)]
+
+
+def stitch_chunks(chunks: list, metadata: list) -> str:
+    """Rebuild the source text covered by consecutive chunks, dropping their overlap"""
+    if not chunks:
+        return ""
+    if any("start" not in meta for meta in metadata):
+        return "\n".join(chunks)
+
+    def source(chunk, meta):
+        # Chunk text ends with the exact source slice; any prefix is a repeated heading
+        return chunk[len(chunk) - (meta["end"] - meta["start"]):]
+
+    parts = [source(chunks[0], metadata[0])]
+    covered = metadata[0]["end"]
+    for chunk, meta in zip(chunks[1:], metadata[1:]):
+        text = source(chunk, meta)
+        overlap = covered - meta["start"]
+        parts.append(text[overlap:] if overlap > 0 else "\n" + text)
+        covered = max(covered, meta["end"])
+
+    return "".join(parts)
@@ -0,0 +1,140 @@
+# stub_ollama_server.py
+"""Local stub of the Ollama HTTP API for development and testing
+
+Serves /api/tags, /api/generate and /api/chat (streaming NDJSON or a
+single JSON object) with a canned answer, so the client can be exercised without a
+real model. Run standalone with:
+
+    python stub_ollama_server.py --port 11435 --token-delay 0.02
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import OLLAMA_MODEL
+
+DEFAULT_ANSWER = "Islam shall be the State religion of Pakistan, as stated in Article 2."
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Request handler; behaviour is configured on the server instance"""
+
+    def log_message(self, format, *args):
+        # Keep test output quiet
+        pass
+
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": self.server.model}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path not in ("/api/generate", "/api/chat"):
+            self._send_json(404, {"error": "not found"})
+            return
+        self.server.last_request = request
+
+        # Simulate a backend that is restarting
+        if self.server.unavailable > 0:
+            self.server.unavailable -= 1
+            self._send_json(503, {"error": "stub unavailable"})
+            return
+
+        # /api/chat wraps text in a message object, /api/generate returns it bare
+        if self.path == "/api/chat":
+            def body(text):
+                return {"message": {"role": "assistant", "content": text}}
+        else:
+            def body(text):
+                return {"response": text}
+
+        # Split the answer into word-sized "tokens"
+        words = self.server.answer.split(" ")
+        tokens = [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+        time.sleep(self.server.first_token_delay)
+
+        if not request.get("stream", True):
+            time.sleep(self.server.token_delay * len(tokens))
+            self._send_json(200, {
+                "model": request.get("model"),
+                **body("".join(tokens)),
+                "done": True,
+                "eval_count": len(tokens)
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        for i, token in enumerate(tokens):
+            # Simulate a backend that fails part-way through a stream
+            if self.server.fail_after is not None and i == self.server.fail_after:
+                self.wfile.write(json.dumps({"error": "stub failure"}).encode('utf-8') + b"\n")
+                self.wfile.flush()
+                return
+
+            line = {"model": request.get("model"), **body(token), "done": False}
+            self.wfile.write(json.dumps(line).encode('utf-8') + b"\n")
+            self.wfile.flush()
+            time.sleep(self.server.token_delay)
+
+        final = {"model": request.get("model"), **body(""), "done": True, "eval_count": len(tokens)}
+        self.wfile.write(json.dumps(final).encode('utf-8') + b"\n")
+        self.wfile.flush()
+
+
+def start_stub_server(port: int = 0, answer: str = DEFAULT_ANSWER, token_delay: float = 0.0,
+                      first_token_delay: float = 0.0, model: str = OLLAMA_MODEL):
+    """Start the stub server in a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubOllamaHandler)
+    server.daemon_threads = True
+    server.answer = answer
+    server.token_delay = token_delay
+    server.first_token_delay = first_token_delay
+    server.model = model
+    server.fail_after = None  # tokens streamed before an error line, None for no error
+    server.unavailable = 0  # requests answered with HTTP 503 before serving normally
+    server.last_request = None
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    """Run the stub server in the foreground"""
+    parser = argparse.ArgumentParser(description="Stub Ollama API server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--answer", default=DEFAULT_ANSWER)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between tokens")
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="Seconds before the first token")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.answer, args.token_delay, args.first_token_delay)
+    print(f"🧪 Stub Ollama server running at {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
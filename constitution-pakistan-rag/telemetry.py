@@ -0,0 +1,270 @@
+# telemetry.py
+"""Per-request tracing, counters and latency histograms for the RAG pipeline
+
+A trace is opened per request (answer_question, a chat turn) and every
+span inside it, on the same thread or an asyncio.to_thread worker, is
+added to its breakdown, as are the spans of a query batch it joined. Span durations also feed per-stage histograms,
+exported in Prometheus text format on a small local HTTP endpoint.
+Requests slower than SLOW_QUERY_THRESHOLD are appended to a JSONL log
+with their full span breakdown.
+"""
+
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from config import TELEMETRY_ENABLED, SLOW_QUERY_THRESHOLD, SLOW_QUERY_LOG
+
+# Histogram bucket upper bounds in seconds, from a FAISS lookup to a slow generation
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_trace = contextvars.ContextVar("rag_trace", default=None)
+
+
+class Trace:
+    """Spans recorded while handling one request"""
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans = []  # (name, offset seconds, duration seconds)
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, duration: float):
+        with self._lock:
+            self.spans.append((name, start - self.start, duration))
+
+    def to_dict(self, total: float) -> dict:
+        return {
+            "name": self.name,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "total_ms": round(total * 1000, 2),
+            "attributes": self.attributes,
+            "spans": [{"name": name, "offset_ms": round(offset * 1000, 2), "duration_ms": round(duration * 1000, 2)}
+                      for name, offset, duration in self.spans]
+        }
+
+
+class Telemetry:
+    """Thread-safe span timings, counters and histograms"""
+
+    def __init__(self, enabled: bool = TELEMETRY_ENABLED, slow_threshold: float = SLOW_QUERY_THRESHOLD,
+                 slow_log_path: str = SLOW_QUERY_LOG):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.slow_log_path = slow_log_path
+
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> count
+        self._histograms = {}  # stage -> {"buckets", "sum", "count"}
+        self._recent = {}  # stage -> recent durations for percentiles
+        self.slow_queries = deque(maxlen=20)
+        self._server = None
+
+    @contextmanager
+    def trace(self, name: str, **attributes):
+        """Collect the spans of one request; nested calls become a span of the outer trace"""
+        if not self.enabled:
+            yield None
+            return
+
+        outer = _current_trace.get()
+        if outer is not None:
+            with self.span(name):
+                yield outer
+            return
+
+        trace = Trace(name, attributes)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        except Exception:
+            self.increment("errors", stage=name)
+            raise
+        finally:
+            _current_trace.reset(token)
+            total = time.perf_counter() - trace.start
+            self.observe(name, total)
+            if total >= self.slow_threshold:
+                self._log_slow(trace.to_dict(total))
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a pipeline stage"""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, start)
+
+    @contextmanager
+    def collect(self, name: str):
+        """Gather the spans of work done on behalf of other requests, such as a query batch
+
+        The spans still feed the histograms once; replay() adds them to each
+        request's own trace.
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        trace = Trace(name, {})
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+
+    def replay(self, collected: Trace):
+        """Add spans gathered by collect() to the current trace, without counting them again"""
+        trace = _current_trace.get()
+        if trace is None or collected is None:
+            return
+        for name, offset, duration in list(collected.spans):
+            trace.add_span(name, collected.start + offset, duration)
+
+    def record(self, name: str, duration: float, start: float = None):
+        """Add a measured stage duration, e.g. time to first token, to the current trace and histograms"""
+        if not self.enabled:
+            return
+
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, start if start is not None else time.perf_counter() - duration, duration)
+        self.observe(name, duration)
+
+    def observe(self, stage: str, duration: float):
+        """Add one duration to a stage histogram"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+                self._histograms[stage] = histogram
+                self._recent[stage] = deque(maxlen=512)
+
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    histogram["buckets"][i] += 1
+                    break
+            histogram["sum"] += duration
+            histogram["count"] += 1
+            self._recent[stage].append(duration)
+
+    def increment(self, name: str, amount: int = 1, **labels):
+        """Bump a counter such as cache_hits, fallbacks or errors"""
+        if not self.enabled:
+            return
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def annotate(self, **attributes):
+        """Attach attributes (mode, chunk count, ...) to the current trace"""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.attributes.update(attributes)
+
+    def _log_slow(self, entry: dict):
+        """Keep a slow request's breakdown in memory and append it to the log file"""
+        self.increment("slow_queries")
+        with self._lock:
+            self.slow_queries.append(entry)
+        try:
+            with open(self.slow_log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write slow query log: {e}")
+
+    def get_stats(self) -> dict:
+        """Counters and per-stage count, p50 and p95 in milliseconds"""
+        with self._lock:
+            counters = {name + "".join(f"[{value}]" for _, value in labels): count
+                        for (name, labels), count in self._counters.items()}
+            stages = {}
+            for stage, recent in self._recent.items():
+                ms = np.asarray(recent) * 1000
+                stages[stage] = {"count": self._histograms[stage]["count"],
+                                 "p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95))}
+        return {"counters": counters, "stages": stages}
+
+    def render_prometheus(self) -> str:
+        """All counters and histograms in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((stage, dict(h, buckets=list(h["buckets"]))) for stage, h in self._histograms.items())
+
+        seen = set()
+        for (name, labels), count in counters:
+            metric = f"rag_{name}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+            lines.append(f"{metric}{{{label_text}}} {count}" if label_text else f"{metric} {count}")
+
+        if histograms:
+            lines.append("# TYPE rag_stage_seconds histogram")
+        for stage, histogram in histograms:
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram["buckets"]):
+                cumulative += count
+                lines.append(f'rag_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'rag_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'rag_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+            lines.append(f'rag_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+
+        return "\n".join(lines) + "\n"
+
+    def start_server(self, port: int, host: str = "127.0.0.1") -> bool:
+        """Serve /metrics (Prometheus) and /slow (recent slow traces) from a background thread"""
+        if self._server is not None:
+            return True
+
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = telemetry.render_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/slow":
+                    body, content_type = json.dumps(list(telemetry.slow_queries), indent=2), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            print(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+            return False
+
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"📈 Metrics at http://{host}:{self._server.server_address[1]}/metrics")
+        return True
+
+
+# Shared by every module of the process
+telemetry = Telemetry()
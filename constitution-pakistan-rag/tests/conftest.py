@@ -0,0 +1,45 @@
+# conftest.py
+"""Shared fixtures: import path, a stand-in embedding model and the stub Ollama server"""
+
+import os
+import sys
+import zlib
+import numpy as np
+import pytest
+
+# Add project directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_ollama_server import start_stub_server
+
+
+class FakeModel:
+    """Bag-of-words hashing encoder with the SentenceTransformer.encode interface"""
+
+    dimension = 64
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, show_progress_bar=False):
+        self.calls.append(list(texts))
+        vectors = np.full((len(texts), self.dimension), 0.01, dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.strip(".,?:;()").encode()) % self.dimension] += 1.0
+        return vectors
+
+
+@pytest.fixture
+def fake_model():
+    return FakeModel()
+
+
+@pytest.fixture
+def stub_ollama():
+    """Start a stub Ollama server; yields the server, whose behaviour tests may change"""
+    server, base_url = start_stub_server()
+    server.base_url = base_url
+    yield server
+    server.shutdown()
+    server.server_close()
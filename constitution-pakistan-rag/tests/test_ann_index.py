@@ -0,0 +1,52 @@
+# test_ann_index.py
+"""Filtered searches on every index type and vector quantization"""
+
+import numpy as np
+import pytest
+
+from ann_index import INDEX_TYPES, QUANTIZATIONS, build_index, rescore, search_params
+from embedding_manager import EmbeddingManager, normalize_vectors
+
+
+def random_vectors(count: int, dimension: int = 32, seed: int = 0) -> np.ndarray:
+    return normalize_vectors(np.random.default_rng(seed).standard_normal((count, dimension)))
+
+
+@pytest.mark.parametrize("quantization", QUANTIZATIONS)
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_filtered_search_returns_only_allowed_ids(index_type, quantization):
+    vectors = random_vectors(400)
+    manager = EmbeddingManager()
+    manager.index_type, manager.quantization = index_type, quantization
+    manager.embeddings = vectors
+    manager.chunks = [f"chunk {i}" for i in range(len(vectors))]
+    manager.create_faiss_index()
+
+    allowed = list(range(100, 140))
+    ids, scores = manager.search_vectors(vectors[[120]], 5, allowed_ids=allowed)[0]
+
+    assert ids and set(ids) <= set(allowed)
+    assert ids[0] == 120
+    assert scores == sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize("index_type", ["ivf_flat", "hnsw"])
+def test_filter_keeps_index_tuning(index_type):
+    index = build_index(random_vectors(400), index_type, "none")
+    params = search_params(index, [1, 2, 3])
+
+    if index_type == "hnsw":
+        assert params.efSearch == index.hnsw.efSearch
+    else:
+        assert params.nprobe == index.nprobe
+
+
+def test_rescore_orders_candidates_exactly():
+    vectors = random_vectors(50)
+    query = vectors[[7]]
+    candidates = np.array([[3, 7, -1, 12]])
+
+    scores, indices = rescore(vectors, query, candidates, 2)
+
+    assert indices[0, 0] == 7
+    assert scores[0, 0] == pytest.approx(1.0, abs=1e-5)
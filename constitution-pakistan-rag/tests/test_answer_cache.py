@@ -0,0 +1,47 @@
+# test_answer_cache.py
+"""Exact and semantic answer cache tiers"""
+
+import numpy as np
+
+from answer_cache import AnswerCache, normalize_query
+
+PARAMS = (5, 0.3)
+
+
+def test_normalized_queries_hit_the_exact_tier():
+    cache = AnswerCache()
+    cache.put("What is the State religion?", PARAMS, "v1", "Islam")
+
+    assert normalize_query("  what IS the state   religion?? ") == "what is the state religion"
+    assert cache.get("what is the state religion", PARAMS, "v1") == "Islam"
+    assert cache.get("what is the state religion", (3, 0.3), "v1") is None
+    assert cache.get_stats()["exact_hits"] == 1
+
+
+def test_corpus_version_change_clears_the_cache():
+    cache = AnswerCache()
+    cache.put("q", PARAMS, "v1", "old answer")
+
+    assert cache.get("q", PARAMS, "v2") is None
+    assert cache.get("q", PARAMS, "v1") is None
+
+
+def test_lru_eviction_and_ttl():
+    cache = AnswerCache(max_size=2)
+    for query in ("a", "b", "c"):
+        cache.put(query, PARAMS, "v1", query.upper())
+    assert cache.get("a", PARAMS, "v1") is None
+    assert cache.get("c", PARAMS, "v1") == "C"
+
+    expired = AnswerCache(ttl=-1)
+    expired.put("a", PARAMS, "v1", "A")
+    assert expired.get("a", PARAMS, "v1") is None
+
+
+def test_semantic_tier_matches_close_embeddings_only():
+    cache = AnswerCache(semantic_enabled=True, max_distance=0.05)
+    cache.put("What is the state religion?", PARAMS, "v1", "Islam", np.array([1.0, 0.0, 0.0]))
+
+    assert cache.get("Which religion is official?", PARAMS, "v1", np.array([0.99, 0.05, 0.0])) == "Islam"
+    assert cache.get("Who appoints judges?", PARAMS, "v1", np.array([0.0, 1.0, 0.0])) is None
+    assert cache.get_stats()["semantic_hits"] == 1
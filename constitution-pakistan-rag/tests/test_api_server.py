@@ -0,0 +1,132 @@
+# test_api_server.py
+"""HTTP endpoints of the headless API, over a small in-memory index and the stub Ollama server"""
+
+import http.client
+import json
+import threading
+import pytest
+
+import rag_system
+from api_server import RAGServer
+from stub_ollama_server import DEFAULT_ANSWER
+
+CHUNKS = ["Article 1: Pakistan shall be a Federal Republic.",
+          "Article 2: Islam shall be the State religion.",
+          "Article 25A: The State shall provide free and compulsory education."]
+
+
+@pytest.fixture
+def api(monkeypatch, fake_model, stub_ollama):
+    """A running API server; yields a function sending one request and returning (status, body)"""
+    monkeypatch.setattr(rag_system, "METRICS_PORT", None)
+    rag = rag_system.RAGSystem()
+    rag.embedding_manager.model = fake_model
+    rag.embedding_manager.update_embeddings(CHUNKS, [{"article": chunk.split(":")[0]} for chunk in CHUNKS])
+    rag.ollama_client.base_url = stub_ollama.base_url
+    rag.initialized = True
+
+    server = RAGServer(("127.0.0.1", 0), rag)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+
+    def send(method: str, path: str, body=None, raw: bytes = None):
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+        payload = raw if raw is not None else (json.dumps(body).encode() if body is not None else None)
+        connection.request(method, path, payload, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        try:
+            data = response.read()
+        except http.client.IncompleteRead as e:
+            data = e.partial
+        connection.close()
+        return response.status, data
+
+    send.rag = rag
+    yield send
+    server.shutdown()
+    server.server_close()
+
+
+def test_health_and_unknown_paths(api):
+    status, body = api("GET", "/health")
+    assert status == 200 and json.loads(body)["searchable"]
+
+    assert api("GET", "/nowhere")[0] == 404
+    assert api("POST", "/nowhere", {"query": "x"})[0] == 404
+
+
+def test_search_returns_ranked_sources(api):
+    status, body = api("POST", "/search", {"query": "free compulsory education", "k": 2})
+
+    assert status == 200
+    sources = json.loads(body)["sources"]
+    assert sources[0]["text"] == CHUNKS[2]
+    assert len(sources) <= 2
+
+
+@pytest.mark.parametrize("request_body", [
+    {"query": ""},
+    {"query": "education", "k": 0},
+    {"query": "education", "threshold": "high"},
+    {"query": "education", "threshold": 2},
+    {"query": "education", "threshold": True},
+    {"query": "education", "filters": ["Article 2"]},
+    {"query": "education", "filters": {"chapter": "1"}},
+])
+def test_invalid_search_requests_are_rejected(api, request_body):
+    status, body = api("POST", "/search", request_body)
+    assert status == 400 and "error" in json.loads(body)
+
+
+@pytest.mark.parametrize("raw", [b"[]", b'"q"', b"42", b"{not json"])
+def test_non_object_bodies_are_rejected(api, raw):
+    assert api("POST", "/search", raw=raw)[0] == 400
+
+
+def test_filters_need_a_corpus(api):
+    status, body = api("POST", "/search", {"query": "education", "filters": {"article": "Article 25A"}})
+    assert status == 400 and "corpus" in json.loads(body)["error"]
+
+
+def test_ask_answers_with_sources(api):
+    status, body = api("POST", "/ask", {"query": "What is the state religion?", "k": 2})
+
+    result = json.loads(body)
+    assert status == 200
+    assert result["answer"] == DEFAULT_ANSWER and result["mode"] == "llm"
+    assert result["sources"]
+
+
+def test_ask_streams_ndjson_lines(api):
+    status, body = api("POST", "/ask", {"query": "What is the state religion?", "stream": True})
+
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert status == 200
+    assert "sources" in lines[0]
+    assert "".join(line["token"] for line in lines[1:-1]) == DEFAULT_ANSWER
+    assert lines[-1]["done"] and lines[-1]["stats"]["mode"] == "stream"
+
+
+def test_stream_failure_after_headers_closes_connection(api):
+    def failing_stream(query, chunks, stats):
+        yield "Partial"
+        raise RuntimeError("generation crashed")
+    api.rag.ollama_client.stream_rag_response = failing_stream
+
+    status, body = api("POST", "/ask", {"query": "What is the state religion?", "stream": True})
+
+    assert status == 200
+    assert b'"token": "Partial"' in body
+    assert b'"done"' not in body and b"generation crashed" not in body
+
+
+def test_batch_searches_every_query(api):
+    queries = ["state religion", "free compulsory education"]
+    status, body = api("POST", "/batch", {"queries": queries, "k": 1, "threshold": 0.0})
+
+    results = json.loads(body)["results"]
+    assert status == 200
+    assert [result["query"] for result in results] == queries
+    assert results[1]["sources"][0]["text"] == CHUNKS[2]
+
+    assert api("POST", "/batch", {"queries": queries, "threshold": "low"})[0] == 400
@@ -0,0 +1,37 @@
+# test_context_packer.py
+"""Token-budgeted prompt context packing"""
+
+from context_packer import count_tokens, pack_context
+
+ARTICLE_2 = "Article 2: Islam shall be the State religion of Pakistan."
+ARTICLE_25A = "Article 25A: The State shall provide free and compulsory education to all children."
+
+
+def test_near_duplicate_chunks_are_packed_once():
+    packed = pack_context("state religion", [ARTICLE_2, ARTICLE_2 + " ", ARTICLE_25A])
+
+    assert packed == [ARTICLE_2, ARTICLE_25A]
+
+
+def test_overlapping_windows_drop_repeated_sentences_but_keep_heading():
+    first = "Article 9: Security of person.\nNo person shall be deprived of life or liberty."
+    second = "Article 9: Security of person.\nNo person shall be deprived of life or liberty.\nSave in accordance with law; clause two applies."
+
+    packed = pack_context("liberty", [first, second], dedup_threshold=1.1)
+
+    assert packed[0] == first
+    assert packed[1].startswith("Article 9") and "Save in accordance with law" in packed[1]
+    assert "deprived of life" not in packed[1]
+
+
+def test_total_stays_under_budget_and_long_chunks_keep_relevant_sentences():
+    filler = " ".join(f"Sentence {i} about procedure." for i in range(60))
+    long_chunk = f"Article 184: Original jurisdiction. {filler} The Supreme Court may make an order on fundamental rights."
+
+    packed = pack_context("Supreme Court fundamental rights order", [long_chunk, ARTICLE_2],
+                          token_budget=120, chunk_max_tokens=60)
+
+    assert sum(count_tokens(text) for text in packed) <= 120
+    assert packed[0].startswith("Article 184")
+    assert "fundamental rights" in packed[0]
+    assert count_tokens(packed[0]) <= 60
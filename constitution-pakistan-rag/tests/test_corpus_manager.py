@@ -0,0 +1,35 @@
+# test_corpus_manager.py
+"""Document discovery and filtered search across corpus shards"""
+
+import pytest
+
+from corpus_manager import CorpusManager
+
+CONSTITUTION = "Article 2. Islam shall be the State religion of Pakistan.\n"
+ACT = "Article 1. This Act may be called the Elections Act and extends to the whole of Pakistan.\n"
+
+
+def corpus(tmp_path, files: dict, fake_model) -> CorpusManager:
+    (tmp_path / "corpus").mkdir()
+    for name, text in files.items():
+        (tmp_path / "corpus" / name).write_text(text)
+    return CorpusManager(str(tmp_path / "corpus"), str(tmp_path / "shards"), fake_model)
+
+
+def test_documents_get_one_shard_each_and_filter_by_id(tmp_path, fake_model):
+    manager = corpus(tmp_path, {"constitution.txt": CONSTITUTION, "Elections Act.txt": ACT}, fake_model)
+    manager.ingest()
+
+    assert sorted(manager.shards) == ["constitution", "elections-act"]
+    chunks, _, _ = manager.search("Pakistan", 5, filters={"document": "elections-act"})
+    assert chunks == [ACT.strip()]
+    manager.close()
+
+
+def test_ids_colliding_across_extensions_are_rejected(tmp_path, fake_model):
+    manager = corpus(tmp_path, {"constitution.txt": CONSTITUTION, "Constitution.pdf": "%PDF"}, fake_model)
+
+    with pytest.raises(ValueError, match="constitution"):
+        manager.ingest()
+    assert not manager.shards
+    manager.close()
@@ -0,0 +1,61 @@
+# test_embedding_manager.py
+"""Incremental re-embedding and index persistence of the embedding manager"""
+
+import numpy as np
+
+from embedding_manager import EmbeddingManager
+
+CHUNKS = ["Article 1: Pakistan shall be a Federal Republic.",
+          "Article 2: Islam shall be the State religion.",
+          "Article 3: The State shall ensure the elimination of all forms of exploitation."]
+
+
+def test_update_encodes_only_new_or_changed_chunks(fake_model):
+    manager = EmbeddingManager(fake_model)
+    manager.update_embeddings(CHUNKS)
+    before = np.array(manager.embeddings)
+
+    changed = [CHUNKS[0], "Article 2: Islam shall be the State religion of Pakistan.", "Article 4: New text."]
+    stats = manager.update_embeddings(changed)
+
+    assert stats == {"reused": 1, "encoded": 2, "removed": 2}
+    assert fake_model.calls[-1] == changed[1:]
+    np.testing.assert_array_equal(manager.embeddings[0], before[0])
+    assert manager.index.ntotal == 3
+    assert manager.matches_chunks(changed)
+
+
+def test_unchanged_chunks_encode_nothing(fake_model):
+    manager = EmbeddingManager(fake_model)
+    manager.update_embeddings(CHUNKS)
+    calls = len(fake_model.calls)
+
+    stats = manager.update_embeddings(CHUNKS + ["   "])
+
+    assert stats == {"reused": 3, "encoded": 0, "removed": 0}
+    assert len(fake_model.calls) == calls
+
+
+def test_saved_embeddings_reload_and_search(tmp_path, fake_model):
+    manager = EmbeddingManager(fake_model)
+    manager.update_embeddings(CHUNKS, [{"article": f"Article {i + 1}"} for i in range(3)])
+    manager.save_embeddings(str(tmp_path / "index"))
+
+    reloaded = EmbeddingManager(fake_model)
+    assert reloaded.load_embeddings(str(tmp_path / "index"))
+    assert reloaded.matches_chunks(CHUNKS, manager.chunk_metadata)
+
+    chunks, scores = reloaded.search("Islam State religion", 1)
+    assert chunks == [CHUNKS[1]]
+    assert 0 < scores[0] <= 1.0
+
+
+def test_threshold_drops_weak_hits(fake_model):
+    manager = EmbeddingManager(fake_model)
+    manager.hybrid = False
+    manager.update_embeddings(CHUNKS)
+
+    chunks, scores = manager.search("Islam religion", 3, threshold=0.3)
+
+    assert chunks == [CHUNKS[1]]
+    assert all(score > 0.3 for score in scores)
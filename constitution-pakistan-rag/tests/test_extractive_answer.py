@@ -0,0 +1,45 @@
+# test_extractive_answer.py
+"""Extractive fallback answers"""
+
+import numpy as np
+
+from extractive_answer import extractive_answer, split_sentences
+
+CHUNKS = [
+    "Article 2: Islam shall be the State religion of Pakistan. The Objectives Resolution is part of the Constitution.",
+    "Article 25A: The State shall provide free and compulsory education. Children aged five to sixteen are covered.",
+]
+
+
+def test_sentences_are_distinct_and_know_their_chunk():
+    sentences, sources = split_sentences(CHUNKS + [CHUNKS[0]])
+
+    assert len(sentences) == 4
+    assert sources.tolist() == [0, 0, 1, 1]
+
+
+def test_best_sentences_are_grouped_under_their_titles():
+    answer = extractive_answer("free compulsory education", CHUNKS, max_sentences=1)
+
+    assert answer == "Article 25A: The State shall provide free and compulsory education."
+
+
+def test_untitled_sentences_get_their_chunk_title():
+    answer = extractive_answer("children aged five", CHUNKS, max_sentences=1)
+
+    assert answer == "Article 25A: Children aged five to sixteen are covered."
+
+
+def test_no_matching_terms_gives_empty_answer():
+    assert extractive_answer("parliament quorum", CHUNKS) == ""
+    assert extractive_answer("anything", []) == ""
+
+
+def test_embeddings_break_ties_between_term_matches():
+    def embed(texts):
+        # Favour the Objectives Resolution sentence
+        return np.array([[1.0, 0.0]] + [[1.0, 0.0] if "Objectives" in text else [0.0, 1.0] for text in texts[1:]])
+
+    answer = extractive_answer("part of Pakistan", CHUNKS, embed=embed, max_sentences=1)
+
+    assert "Objectives Resolution" in answer
@@ -0,0 +1,82 @@
+# test_index_store.py
+"""Round trips through the versioned index directory"""
+
+import json
+import os
+import numpy as np
+
+from ann_index import build_index
+from embedding_manager import normalize_vectors
+from index_store import (HEADER_FILE, ChunkStore, compute_corpus_hash, load_index, read_manifest,
+                         save_index, write_manifest)
+from sparse_index import BM25Index
+
+CHUNKS = ["Article 1: Pakistan shall be a Federal Republic.",
+          "Article 2: Islam shall be the State religion.",
+          "Article 25A: The State shall provide free education — ünïcode."]
+
+
+def saved_index(directory: str, model_name: str = "test-model") -> dict:
+    vectors = normalize_vectors(np.random.default_rng(0).standard_normal((len(CHUNKS), 16)))
+    metadata = [{"article": chunk.split(":")[0]} for chunk in CHUNKS]
+    header = save_index(directory, vectors, CHUNKS, build_index(vectors, "flat", "none"), model_name,
+                        metadata=metadata, sparse_index=BM25Index.build(CHUNKS))
+    return {"header": header, "vectors": vectors, "metadata": metadata}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    directory = str(tmp_path / "index")
+    saved = saved_index(directory)
+    loaded = load_index(directory, "test-model")
+
+    assert list(loaded["chunks"]) == CHUNKS
+    assert loaded["metadata"] == saved["metadata"]
+    np.testing.assert_allclose(loaded["vectors"], saved["vectors"], atol=1e-6)
+    assert loaded["index"].ntotal == len(CHUNKS)
+    assert loaded["sparse"].search("education", 1)[0] == [2]
+    assert loaded["header"]["corpus_hash"] == compute_corpus_hash(CHUNKS)
+    assert not [name for name in os.listdir(tmp_path) if ".tmp" in name]
+
+
+def test_chunk_store_reads_slices_and_negative_indexes(tmp_path):
+    directory = str(tmp_path / "index")
+    saved_index(directory)
+    store = ChunkStore.from_directory(directory)
+
+    assert len(store) == len(CHUNKS)
+    assert store[-1] == CHUNKS[-1]
+    assert store[0:2] == CHUNKS[:2]
+
+
+def test_other_model_or_format_is_rejected(tmp_path):
+    directory = str(tmp_path / "index")
+    saved_index(directory)
+    assert load_index(directory, "another-model") is None
+
+    header_path = os.path.join(directory, HEADER_FILE)
+    with open(header_path, encoding="utf-8") as f:
+        header = json.load(f)
+    header["format_version"] = -1
+    with open(header_path, "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    assert load_index(directory, "test-model") is None
+
+
+def test_saving_again_replaces_the_index(tmp_path):
+    directory = str(tmp_path / "index")
+    saved_index(directory)
+    write_manifest(directory, {"source_path": "a.pdf"})
+    saved_index(directory, "new-model")
+
+    assert load_index(directory, "new-model") is not None
+    assert read_manifest(directory) is None
+    assert os.listdir(tmp_path) == ["index"]
+
+
+def test_manifest_is_swapped_in_with_the_index(tmp_path):
+    directory = str(tmp_path / "index")
+    vectors = normalize_vectors(np.ones((len(CHUNKS), 4)))
+    save_index(directory, vectors, CHUNKS, None, "test-model", manifest={"source_path": "b.pdf"})
+
+    assert read_manifest(directory) == {"source_path": "b.pdf"}
+    assert load_index(directory, "test-model") is not None
@@ -0,0 +1,120 @@
+# test_ollama_client.py
+"""Streaming generation against the stub Ollama server"""
+
+import pytest
+
+from ollama_client import OllamaClient
+from stub_ollama_server import DEFAULT_ANSWER
+
+CHUNKS = ["Article 2: Islam shall be the State religion of Pakistan."]
+
+
+def stream(client: OllamaClient, query: str = "What is the state religion?", history: list = None) -> tuple:
+    stats = {}
+    pieces = list(client.stream_rag_response(query, CHUNKS, stats, history))
+    return pieces, stats
+
+
+def test_stream_yields_tokens_in_order_with_stats(stub_ollama):
+    stub_ollama.token_delay = 0.01
+    pieces, stats = stream(OllamaClient(base_url=stub_ollama.base_url))
+
+    assert "".join(pieces) == DEFAULT_ANSWER
+    assert pieces[0] == DEFAULT_ANSWER.split(" ")[0]
+    assert stats["mode"] == "stream"
+    assert stats["tokens"] == len(DEFAULT_ANSWER.split(" "))
+    assert 0 < stats["time_to_first_token"] <= stats["total_time"]
+    assert stats["tokens_per_sec"] > 0
+    assert not stats.get("truncated")
+
+
+def test_stream_cut_off_at_latency_budget_is_partial(stub_ollama):
+    stub_ollama.token_delay = 0.05
+    client = OllamaClient(base_url=stub_ollama.base_url)
+    client.latency_budget = 0.2
+
+    pieces, stats = stream(client)
+
+    assert pieces and len("".join(pieces)) < len(DEFAULT_ANSWER)
+    assert DEFAULT_ANSWER.startswith("".join(pieces))
+    assert stats["truncated"] and stats["mode"] == "partial"
+
+
+def test_stream_failing_mid_response_keeps_shown_text(stub_ollama):
+    stub_ollama.fail_after = 3
+    pieces, stats = stream(OllamaClient(base_url=stub_ollama.base_url))
+
+    assert "".join(pieces) == " ".join(DEFAULT_ANSWER.split(" ")[:3])
+    assert stats["mode"] == "partial"
+    assert "stub failure" in stats["error"]
+
+
+def test_stream_without_first_token_in_budget_falls_back(stub_ollama):
+    stub_ollama.first_token_delay = 0.5
+    client = OllamaClient(base_url=stub_ollama.base_url)
+    client.latency_budget = 0.2
+
+    pieces, stats = stream(client)
+
+    assert stats["mode"] == "fallback"
+    assert stats["time_to_first_token"] is None
+    assert "Islam shall be the State religion" in "".join(pieces)
+
+
+def test_generate_returns_answer_without_think_block(stub_ollama):
+    stub_ollama.answer = "<think>reasoning</think> Islam is the State religion."
+    stats = {}
+    answer = OllamaClient(base_url=stub_ollama.base_url).generate_rag_response("State religion?", CHUNKS, stats)
+
+    assert answer == "Islam is the State religion."
+    assert stats["mode"] == "llm"
+
+
+def test_chat_payload_sends_system_message_history_and_context(stub_ollama):
+    client = OllamaClient(base_url=stub_ollama.base_url)
+    history = [{"role": "user", "content": "Earlier?"}, {"role": "assistant", "content": "Earlier answer"}]
+    stream(client, history=history)
+
+    messages = stub_ollama.last_request["messages"]
+    assert [message["role"] for message in messages] == ["system", "user", "assistant", "user"]
+    assert "Article 2" in messages[-1]["content"]
+    assert stub_ollama.last_request["options"]["num_ctx"] > 2048
+
+
+def test_only_finished_streams_are_remembered(stub_ollama):
+    client = OllamaClient(base_url=stub_ollama.base_url)
+    history = []
+    stream(client, "First question?", history)
+    assert [message["content"] for message in history] == ["First question?", DEFAULT_ANSWER]
+
+    stub_ollama.fail_after = 2
+    stream(client, "Failed question?", history)
+    stub_ollama.fail_after = None
+    stub_ollama.token_delay = 0.05
+    client.latency_budget = 0.2
+    _, stats = stream(client, "Truncated question?", history)
+
+    assert stats["mode"] == "partial"
+    assert len(history) == 2
+
+
+def test_generate_retries_gateway_errors(stub_ollama):
+    stub_ollama.unavailable = 1
+    stats = {}
+    answer = OllamaClient(base_url=stub_ollama.base_url).generate_rag_response("State religion?", CHUNKS, stats)
+
+    assert answer == DEFAULT_ANSWER
+    assert stats["mode"] == "llm"
+
+
+def test_retries_stop_at_the_latency_budget(stub_ollama):
+    stub_ollama.unavailable = 100
+    client = OllamaClient(base_url=stub_ollama.base_url)
+    client.max_retries = 100
+    client.latency_budget = 0.3
+
+    stats = {}
+    client.generate_rag_response("State religion?", CHUNKS, stats)
+
+    assert stats["mode"] == "fallback"
+    assert stats["total_time"] < 0.6
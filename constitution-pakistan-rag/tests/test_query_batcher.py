@@ -0,0 +1,87 @@
+# test_query_batcher.py
+"""Micro-batching of concurrent searches"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+from embedding_manager import EmbeddingManager
+from query_batcher import QueryBatcher
+from telemetry import telemetry
+
+CHUNKS = ["Article 1: Pakistan shall be a Federal Republic.",
+          "Article 2: Islam shall be the State religion.",
+          "Article 25A: The State shall provide free education."]
+
+
+class SlowManager(EmbeddingManager):
+    """Holds the first batch until every caller has queued, so they share the next one"""
+
+    def __init__(self, model, release: threading.Event):
+        super().__init__(model)
+        self.release = release
+        self.batch_sizes = []
+
+    def search_batch(self, queries, k=5, threshold=None, expand=False, allowed_ids=None):
+        self.batch_sizes.append(len(queries))
+        self.release.wait(5)
+        return super().search_batch(queries, k, threshold, expand, allowed_ids)
+
+
+def test_single_search_matches_direct_search(fake_model):
+    manager = EmbeddingManager(fake_model)
+    manager.update_embeddings(CHUNKS)
+
+    assert QueryBatcher(manager).search("State religion", 2) == manager.search("State religion", 2)
+
+
+def test_concurrent_searches_share_batches_and_get_their_own_results(fake_model):
+    release = threading.Event()
+    manager = SlowManager(fake_model, release)
+    manager.update_embeddings(CHUNKS)
+    batcher = QueryBatcher(manager, max_batch_size=8, max_wait_ms=50)
+    queries = ["State religion", "free education", "Federal Republic", "Islam", "education"]
+
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        futures = [pool.submit(batcher.search, query, k) for query, k in zip(queries, (1, 2, 1, 3, 1))]
+        deadline = time.monotonic() + 5
+        while not manager.batch_sizes or manager.batch_sizes[0] + batcher._queue.qsize() < len(queries):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    # Whatever the first batch held, everyone queued behind it is served by one more
+    assert len(manager.batch_sizes) <= 2 and sum(manager.batch_sizes) == len(queries)
+    assert results[0][0] == [CHUNKS[1]]
+    assert results[1][0][0] == CHUNKS[2] and len(results[1][0]) == 2
+    assert results[2][0] == [CHUNKS[0]]
+    assert batcher.get_stats()["queries"] == len(queries)
+
+
+def test_errors_reach_every_caller(fake_model):
+    manager = EmbeddingManager(fake_model)
+    manager.update_embeddings(CHUNKS)
+    manager.search_batch = lambda *args, **kwargs: 1 / 0
+    batcher = QueryBatcher(manager)
+
+    with pytest.raises(ZeroDivisionError):
+        batcher.search("anything")
+
+
+def test_batch_spans_reach_each_callers_trace(fake_model):
+    manager = EmbeddingManager(fake_model)
+    manager.update_embeddings(CHUNKS)
+    batcher = QueryBatcher(manager)
+
+    def traced_search(query):
+        with telemetry.trace("test_search") as trace:
+            batcher.search(query, 1)
+        return {name for name, _, _ in trace.spans}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        span_names = list(pool.map(traced_search, ["State religion", "free education"]))
+
+    for names in span_names:
+        assert {"query_encode", "index_search"} <= names
@@ -0,0 +1,55 @@
+# test_rag_system.py
+"""Initialization and forced reload of the RAG system over a small corpus"""
+
+import pytest
+
+import rag_system
+from corpus_manager import CorpusManager
+
+DOCUMENT = """PART I
+Introductory
+
+Article 1. Pakistan shall be a Federal Republic to be known as the Islamic Republic of Pakistan.
+
+Article 2. Islam shall be the State religion of Pakistan.
+"""
+
+
+@pytest.fixture
+def rag(monkeypatch, tmp_path, fake_model, stub_ollama):
+    monkeypatch.setattr(rag_system, "METRICS_PORT", None)
+    (tmp_path / "corpus").mkdir()
+    (tmp_path / "corpus" / "constitution.txt").write_text(DOCUMENT)
+
+    system = rag_system.RAGSystem()
+    system.embedding_manager.model = fake_model
+    system.corpus_manager = CorpusManager(str(tmp_path / "corpus"), str(tmp_path / "shards"), fake_model)
+    system.ollama_client.base_url = stub_ollama.base_url
+    assert system.initialize_system()
+    yield system
+    system.corpus_manager.close()
+
+
+def test_forced_reload_swaps_in_new_managers(rag):
+    previous = rag.corpus_manager
+
+    assert rag.initialize_system(force=True)
+
+    assert rag.initialized
+    assert rag.corpus_manager is not previous
+    assert rag.corpus_manager.corpus_dir == previous.corpus_dir
+    assert rag.corpus_manager.corpus_hash == previous.corpus_hash
+    assert previous._executor._shutdown
+    chunks, _ = rag.search("State religion", 1)
+    assert "Islam shall be the State religion" in chunks[0]
+
+
+def test_failed_reload_keeps_serving_the_current_index(rag, monkeypatch):
+    previous = rag.corpus_manager
+    monkeypatch.setattr(CorpusManager, "ingest", lambda self: {})
+
+    assert not rag.initialize_system(force=True)
+
+    assert rag.initialized and rag.corpus_manager is previous
+    assert not previous._executor._shutdown
+    assert rag.search("State religion", 1)[0]
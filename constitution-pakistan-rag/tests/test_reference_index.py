@@ -0,0 +1,53 @@
+# test_reference_index.py
+"""Article, clause and Part references resolved from chunk metadata"""
+
+from document_processor import DocumentProcessor
+from embedding_manager import EmbeddingManager
+from reference_index import build_reference_index, find_parts, find_references, resolve_parts, resolve_references
+
+METADATA = [
+    {"part": "PART I", "article": "Article 1", "clause": None},
+    {"part": "PART II", "article": "Article 184", "clause": "Article 184(1)"},
+    {"part": "PART II", "article": "Article 184", "clause": "Article 184(3)"},
+    {"part": "PART II", "article": "Article 25A", "clause": None},
+]
+
+
+def test_find_references_with_clause_fallback():
+    assert find_references("What does Article 184(3) say, and art. 25a?") == [
+        ["Article 184(3)", "Article 184"], ["Article 25A"]]
+    assert find_references("Tell me about Part II") == []
+    assert find_parts("Tell me about Part II and part iv") == ["PART II"]
+
+
+def test_resolve_references_in_mention_order():
+    index = build_reference_index(METADATA)
+
+    assert resolve_references(index, "Article 25A and Article 184(3)") == [3, 2]
+    # A clause without its own chunk falls back to its article
+    assert resolve_references(index, "Article 184(7)") == [1, 2]
+    assert resolve_references(index, "Article 999") == []
+
+
+def test_parts_resolve_to_a_filter():
+    index = build_reference_index(METADATA)
+
+    assert resolve_parts(index, "Explain Part II") == [1, 2, 3]
+    assert resolve_parts(index, "Explain Part IX") is None
+    assert resolve_parts(index, "Explain Article 1") is None
+
+
+def test_named_part_narrows_search(fake_model):
+    processor = DocumentProcessor()
+    chunks = processor.chunk_document(
+        "PART I - INTRODUCTORY\n\nArticle 1: Pakistan shall be a Federal Republic of freedom.\n"
+        "PART II - FUNDAMENTAL RIGHTS\n\nArticle 19: Freedom of speech and expression.\n"
+        "Article 20: Freedom to profess religion.\n")
+    manager = EmbeddingManager(fake_model)
+    manager.update_embeddings(chunks, processor.chunk_metadata)
+
+    allowed = manager.part_ids("freedom in Part II")
+    found, _ = manager.search("freedom", 3, allowed_ids=allowed)
+
+    assert found and all(not chunk.startswith("Article 1:") for chunk in found)
+    assert manager.lookup_references("Article 20")[0] == [chunks[2]]
@@ -0,0 +1,62 @@
+# test_sparse_index.py
+"""BM25 retrieval and reciprocal-rank fusion"""
+
+import pytest
+
+from embedding_manager import EmbeddingManager
+from sparse_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+CHUNKS = ["Article 1: Pakistan shall be a Federal Republic.",
+          "Article 2: Islam shall be the State religion.",
+          "Article 25A: The State shall provide free and compulsory education to all children.",
+          "Article 25: All citizens are equal before law."]
+
+
+def test_tokenize_keeps_article_numbers_whole():
+    assert tokenize("Article 25A(1), Part II") == ["article", "25a", "1", "part", "ii"]
+
+
+def test_bm25_ranks_exact_terms_first():
+    index = BM25Index.build(CHUNKS)
+
+    ids, scores = index.search("free education", 2)
+
+    assert ids == [2]
+    assert scores[0] > 0
+    assert index.search("25a", 5)[0] == [2]
+    assert index.search("unknownword", 5) == ([], [])
+
+
+def test_bm25_search_respects_allowed_ids():
+    index = BM25Index.build(CHUNKS)
+    assert index.search("religion education", 5, allowed_ids=[1, 3])[0] == [1]
+    assert index.search("religion", 5, allowed_ids=[0, 3])[0] == []
+
+
+def test_bm25_save_and_load(tmp_path):
+    index = BM25Index.build(CHUNKS)
+    index.save(str(tmp_path))
+
+    loaded = BM25Index.load(str(tmp_path))
+
+    assert loaded.search("religion", 5) == index.search("religion", 5)
+    assert BM25Index.load(str(tmp_path / "missing")) is None
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    ids, scores = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+
+    assert ids == [1, 3, 2]
+    assert scores[0] == pytest.approx(1 / 61 + 1 / 62)
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_hybrid_search_surfaces_exact_reference(fake_model):
+    manager = EmbeddingManager(fake_model)
+    manager.update_embeddings(CHUNKS)
+
+    # The cosine threshold removes every dense hit, BM25 still finds the article
+    chunks, scores = manager.search("Article 25A", 2, threshold=0.99)
+
+    assert chunks[0] == CHUNKS[2]
+    assert len(scores) == len(chunks)
@@ -0,0 +1,30 @@
+# test_structural_chunker.py
+"""Regression tests for the structural chunker"""
+
+from structural_chunker import StructuralChunker
+
+
+def chunk(text: str) -> tuple:
+    chunker = StructuralChunker()
+    chunks = chunker.feed(text, 1) + chunker.finish()
+    return chunks, [chunker.metadata(record) for record in chunker.records]
+
+
+def test_article_on_first_line_is_kept():
+    chunks, metadata = chunk("Article 1: Pakistan shall be a Federal Republic.\n"
+                             "Article 2: Islam shall be the State religion.\n")
+
+    assert chunks == ["Article 1: Pakistan shall be a Federal Republic.",
+                      "Article 2: Islam shall be the State religion."]
+    assert [meta["article"] for meta in metadata] == ["Article 1", "Article 2"]
+    assert metadata[0]["start"] == 0
+
+
+def test_part_on_first_line_is_parent_of_its_articles():
+    _, metadata = chunk("PART I - INTRODUCTORY\n\n"
+                        "Article 1: Pakistan shall be a Federal Republic.\n"
+                        "PART II - FUNDAMENTAL RIGHTS\n\n"
+                        "Article 8: Laws inconsistent with fundamental rights to be void.\n")
+
+    articles = [(meta["part"], meta["article"]) for meta in metadata if meta["article"]]
+    assert articles == [("PART I", "Article 1"), ("PART II", "Article 8")]